@@ -1,93 +1,206 @@
 import streamlit as st
-import pandas as pd
-from utils.io import load_data
-from utils.prep import make_tables
-from utils.viz import line_chart, bar_chart, map_chart
+from utils.io import csv_columns
+from utils.store import DataStore
+from utils.prep import filter_options
+from utils.schema import memory_report
+from utils.cube import CubeEngine, cube_dir
+from utils.shared import SharedDataset, session_memory
+from utils.warmup import SERVING, Warmup, warm_charts, warm_views
+from utils import config, instrument
+from sections.filters import selection_filters, show_filters
 from sections.intro import show_intro
 from sections.overview import show_overview
+from sections.compare import show_comparison
 from sections.deep_dives import show_deep_dives
 from sections.conclusions import show_resume, show_conclusions
+from sections.debug import show_debug_panel
+from sections.export import show_export
+from sections.warmup import show_warmup, show_warmup_status
 
 
 st.set_page_config(page_title="Data Storytelling Dashboard - Dosimetry", layout="wide")
 
-@st.cache_data(show_spinner=False)
-def get_data():
-    df_raw = load_data()
-    tables = make_tables(df_raw)
-    return df_raw, tables
+@st.cache_resource(show_spinner=False)
+def get_store():
+    # One store per process: files are re-parsed only when they change
+    # The DuckDB backend queries the files itself: the store only tracks them
+    return DataStore(config.DATA_DIR, streaming=config.STREAMING, parse=config.BACKEND == 'pandas')
+
+# `data_version` only keys the caches below: it changes when a file of the
+# data folder is added, modified or removed (see DataStore.refresh)
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_dataset(data_version):
+    # One read-only copy of the rows per process, shared by every session
+    # (st.cache_data would unpickle a new copy for each session and rerun)
+    instrument.cache_miss('get_dataset')
+    return SharedDataset(get_store().frame())
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_engine(data_version):
+    # Shared across reruns and sessions so the rollup memo is reused;
+    # built from the per-file partials merged by the store
+    store = get_store()
+    if config.BACKEND == 'duckdb':
+        from utils.duck import DuckDBEngine
+        return DuckDBEngine(sorted(store.files()))
+    # Dense cube memory-mapped from disk: one physical copy for every worker
+    # process serving the same files (keyed on their content)
+    return CubeEngine(store.partials(), cache_dir=cube_dir(config.DATA_DIR, store.files()))
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def get_columns(data_version):
+    # Columns of the CSV exports, whatever the mode (the rows may not be loaded)
+    return csv_columns(sorted(get_store().files()))
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def get_memory_report(data_version):
+    return memory_report(get_dataset(data_version).frame)
+
+def warm_up():
+    # Same cached calls as a script run, so they fill the caches the sessions read
+    yield "Loading the data files"
+    store = get_store()
+    data_version = store.refresh()
+    yield "Building the aggregation engine"
+    engine = get_engine(data_version)
+    if config.STREAMING or config.BACKEND == 'duckdb':
+        options = engine.dimensions()
+    else:
+        yield "Indexing the rows"
+        options = get_dataset(data_version).options
+    yield SERVING
+    yield from warm_views(engine, options)
+    yield from warm_charts(engine, options)
+
+@st.cache_resource(show_spinner=False)
+def get_warmup():
+    # Started by the first script run of the process, shared by every session
+    return Warmup(warm_up).start()
 
 st.title(":bar_chart: Dosimetry - Radiation Exposure")
 st.caption("Source: Exposition professionnelle aux rayonnements ionisants en Europe - DataGouv.fr - Licence Ouverte")
 
-raw, tables = get_data()
+warmup = get_warmup() if config.WARMUP else None
+if warmup is not None and not warmup.serving:
+    # Progress only; the page reloads itself when the data is ready
+    show_warmup(warmup)
+    st.stop()
+
+# Cheap when nothing changed: one stat() per file
+store = get_store()
+data_version = store.refresh()
+if not store.files():
+    # Every file removed since the server started
+    st.warning(f":x: No data file left in {config.DATA_DIR}: add the CSV exports back and reload the page")
+    st.stop()
+
+engine = get_engine(data_version)
+if config.STREAMING or config.BACKEND == 'duckdb':
+    # No raw rows in memory: filter options come from the engine
+    dataset = None
+    options = engine.dimensions()
+else:
+    with instrument.cache_probe('get_dataset'):
+        dataset = get_dataset(data_version)
+    # Distinct dimension values only, not the rows
+    options = dataset.options
+if options.empty:
+    st.warning(":x: The data files hold no row")
+    st.stop()
 
 # === SIDEBAR - FILTERS ===
 with st.sidebar:
     st.header(":gear: Filters")
     
-    # Country filter
-    all_countries = raw['country'].unique().tolist()
-    selected_countries = st.multiselect(
-        "Country",
-        all_countries,
-        default=all_countries,
-        help="Select countries to display"
-    )
-    
-    # Year range filter
-    min_year = raw['year'].min()
-    max_year = raw['year'].max()
-    year_range = st.slider(
-        "Year range",
-        min_value=int(min_year),
-        max_value=int(max_year),
-        value=(int(min_year), int(max_year)),
-        help="Select the period to analyse"
-    )
-    
-    # Sector filter (dynamic list, keep 'All' as first option)
-    sectors_from_data = raw['sector'].dropna().unique().tolist()
-    # Preferred order defined by the user; any other sectors from data will be appended
-    preferred_order = [
-        'ALL MONITORED WORKERS', 'MEDICAL FIELD', 'INDUSTRY', 'NUCLEAR FIELD',
-        'RESEARCH AND EDUCATION', 'NATURAL SOURCES', 'TRANSPORT', 'OTHER FIELDS'
-    ]
-    ordered = [s for s in preferred_order if s in sectors_from_data]
-    others = [s for s in sectors_from_data if s not in preferred_order]
-    sectors = ['All'] + ordered + sorted(others)
-
-    selected_sector = st.selectbox(
-        "Sector",
-        sectors,
-        index=0,
-        help="Choose the sector to analyse (or 'All' to include every sector)"
+    choices = filter_options(options)
+
+    # Second set of filters shown side by side with the first (sections/compare.py)
+    compare = st.toggle(
+        "Compare two selections",
+        help="Choose a second selection (B) and compare it with the first (A)"
     )
+    if compare:
+        st.subheader("Selection A")
+    selection = show_filters(choices)
+    selection_b = None
+    if compare:
+        st.subheader("Selection B")
+        selection_b = show_filters(choices, key='b')
+    selected_countries = selection['countries']
+    year_range = selection['year_range']
+    selected_sector = selection['sector']
+    selected_label = selection['label']
     
     st.markdown("---")
     st.markdown("### :pushpin: About")
-    st.info("This data set has **3082** rows and 7 columns, covering dosimetry records from various countries and sectors over multiple years.")
+    st.info(f"This data set has **{engine.totals()['rows']:,}** rows and {len(get_columns(data_version))} columns, "
+            "covering dosimetry records from various countries and sectors over multiple years.")
+    if dataset is not None:
+        mem = get_memory_report(data_version)
+        st.caption(
+            f"In-memory size: {mem['schema_bytes'] / 1e6:.2f} MB "
+            f"({mem['saved_ratio']:.0%} smaller than untyped columns), shared by every session"
+        )
+    st.caption(f"Data version {data_version} - {len(store.files())} file(s) loaded")
+    if isinstance(engine, CubeEngine):
+        st.caption(f"Dose cube: {engine.cube.nbytes() / 1e6:.2f} MB, shared between worker processes")
+    if warmup is not None:
+        show_warmup_status(warmup)
+
+    # Only with DASHBOARD_PROFILE=1
+    if instrument.ENABLED:
+        show_debug_panel(engine)
 
 # === APPLY FILTERS ===
-mask = (
-    (raw['country'].isin(selected_countries)) &
-    (raw['year'] >= year_range[0]) &
-    (raw['year'] <= year_range[1])
-)
-if selected_sector != 'All':
-    mask &= (raw['sector'] == selected_sector)
+# Same selection, as keyword arguments of AggregationEngine.rollup
+filters = selection_filters(selection)
+filters_b = selection_filters(selection_b) if compare else None
 
-filtered_data = raw[mask].copy()
+# KPIs of the selection and of the whole dataset (for the selected label),
+# answered by the engine (cube slices by default) without touching the rows
+with instrument.stage('app.summary'):
+    summary = engine.totals(**filters)
+    overall = engine.totals(labels=filters['labels'])
+
+# Inputs the sections pick from (each one declares what it depends on,
+# see utils.units)
+context = {
+    'data_version': data_version,
+    'engine': engine,
+    'dataset': dataset,
+    'data_files': store.files(),
+    'filters': filters,
+    'filters_b': filters_b,
+    'summary': summary,
+    'overall': overall,
+    'year_range': year_range,
+    'selected_countries': selected_countries,
+    'selected_sector': selected_sector,
+    'selected_label': selected_label,
+}
 
 # === INTRO SECTION ===
-show_intro()
+show_intro(context)
 
 # === OVERVIEW SECTION ===
-show_overview(filtered_data, raw)
+if compare:
+    # Selections A and B side by side; the sections below show selection A
+    show_comparison(context)
+else:
+    show_overview(context)
 
 # === DEEP DIVE SECTION ===
-show_deep_dives(filtered_data)
+show_deep_dives(context)
 
 # === CONCLUSIONS SECTION ===
-show_resume(filtered_data, year_range, selected_countries, selected_sector)
-show_conclusions()
\ No newline at end of file
+show_resume(context)
+show_conclusions(context)
+
+# === EXPORT SECTION ===
+show_export(context)
+
+# Memory held by this session alone: the dataset, cube and engine are shared
+# by every session of the process and are not counted
+with st.sidebar:
+    session_bytes = sum(session_memory(st.session_state, shared=(engine, dataset)).values())
+    st.caption(f"This session: {session_bytes / 1e3:,.1f} kB of section results and widget state")
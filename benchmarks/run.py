@@ -0,0 +1,294 @@
+"""Benchmark the load -> prep -> render-preparation pipeline.
+
+Every stage (parsing, caching, make_tables, filtering, aggregation, chart
+and map preparation) is timed and memory-profiled on its own, outside of
+any Streamlit server, on synthetic exports of increasing size (see
+`benchmarks.synth`). One JSON object per (size, stage) is appended to the
+results file so runs can be compared across commits.
+
+Usage:
+    python -m benchmarks.run --sizes 10k 1m --repeat 3
+    python -m benchmarks.run --sizes 10m --skip-memory
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from benchmarks.synth import generate, parse_size
+from utils.aggregate import AggregationEngine, sector_filter
+from utils.cube import CubeEngine
+from utils.dist import band_matrix, percentiles
+from utils.index import FilterIndex
+from utils.io import _cache_paths, load_data
+from utils.prep import make_tables
+from utils.trends import analyze
+from utils.viz import bar_chart_spec, line_chart_spec, map_deck, map_layer_payload, prepare_map_data
+
+
+DEFAULT_SIZES = ('10k', '1m')
+DATA_DIR = os.path.join('benchmarks', 'data')
+RESULTS_PATH = os.path.join('benchmarks', 'results', 'results.jsonl')
+
+
+def git_commit():
+    """Return the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(func, repeat=1, memory=True):
+    """Run `func` and return (result, timings, peak traced bytes).
+
+    Timings are wall-clock seconds of `repeat` untraced runs; the peak
+    allocation is taken from one extra run under tracemalloc (which slows
+    the code down, hence the separate run).
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, timings, peak
+
+
+def clear_cache(path):
+    """Remove the Parquet cache of `path` so the next load parses the CSV."""
+    part_dir, meta_path = _cache_paths(path)
+    shutil.rmtree(part_dir, ignore_errors=True)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+
+def selection(raw):
+    """Return a representative sidebar selection for `raw`.
+
+    Half of the countries, the second half of the year range and one
+    sector, as (countries, year_range, sector).
+    """
+    countries = raw['country'].unique().tolist()
+    years = sorted(raw['year'].unique().tolist())
+    return countries[::2], (int(years[len(years) // 2]), int(years[-1])), 'MEDICAL FIELD'
+
+
+def check_partition_load(path, cached):
+    """Raise AssertionError if a filtered cache read differs from a fresh filtered parse."""
+    label, sector = cached['label'].iloc[0], cached['sector'].iloc[0]
+    fresh = load_data(path, use_cache=False, labels=[label], sectors=[sector])
+    assert_frame_equal(cached, fresh)
+
+
+def pipeline_stages(path):
+    """Yield (stage name, callable) pairs; later stages reuse earlier results."""
+    state = {}
+
+    def parse():
+        return load_data(path, use_cache=False)
+
+    def load_cold():
+        clear_cache(path)
+        state['raw'] = load_data(path)
+        return state['raw']
+
+    def load_cached():
+        return load_data(path)
+
+    def load_partition():
+        # Only the (label, sector) partitions of the selection are read
+        _, _, sector = state['selection']
+        return load_data(path, labels=[state['raw']['label'].iloc[0]], sectors=[sector])
+
+    def tables():
+        return make_tables(state['raw'])
+
+    def filter_mask():
+        # The boolean mask formerly built in app.py on every rerun
+        raw = state['raw']
+        countries, year_range, sector = state['selection']
+        mask = (
+            (raw['country'].isin(countries)) &
+            (raw['year'] >= year_range[0]) &
+            (raw['year'] <= year_range[1])
+        )
+        mask &= (raw['sector'] == sector)
+        return raw[mask].copy()
+
+    def index_build():
+        state['index'] = FilterIndex(state['raw'])
+        return state['index']
+
+    def index_select():
+        countries, year_range, sector = state['selection']
+        return state['index'].select(state['raw'], countries, year_range, sector)
+
+    def engine_build():
+        state['engine'] = AggregationEngine(state['raw'])
+        return state['engine']
+
+    def filters():
+        countries, year_range, sector = state['selection']
+        return {'countries': countries, 'year_range': year_range, 'sectors': sector_filter(sector)}
+
+    def rollup_cold():
+        engine = AggregationEngine(partials=state['engine'].partials)
+        return engine.rollup('year', **filters()), engine.rollup('country', **filters())
+
+    def rollup_memo():
+        engine = state['engine']
+        state['timeseries'] = engine.rollup('year', **filters())
+        state['by_country'] = engine.rollup('country', **filters())
+        return state['timeseries'], state['by_country']
+
+    def cube_build():
+        state['cube'] = CubeEngine(state['engine'].partials)
+        return state['cube']
+
+    def cube_rollup():
+        # Axis slices and sums on the dense cube, memo bypassed
+        cube = state['cube']
+        return (cube._compute(('year',), *cube_filters()), cube._compute(('country',), *cube_filters()),
+                cube._compute((), *cube_filters()))
+
+    def cube_filters():
+        countries, year_range, sector = state['selection']
+        return countries, year_range, sector_filter(sector), None, None
+
+    def duckdb_rollup():
+        # SQL on the files (Parquet copy written by load_data), memo bypassed
+        from utils.duck import DuckDBEngine
+        engine = DuckDBEngine([path])
+        return engine.rollup('year', **filters()), engine.rollup('country', **filters())
+
+    def trends():
+        # Every country x year of the selection years, pivoted and analyzed at once
+        _, year_range, sector = state['selection']
+        table = state['cube'].rollup(('country', 'year'), year_range=year_range, sectors=sector_filter(sector))
+        return analyze(table, 'average_dose_monitored')
+
+    def line_prep():
+        return line_chart_spec(state['timeseries']).to_dict()
+
+    def bar_prep():
+        data = state['by_country'].rename(columns={'country': 'region'})
+        return bar_chart_spec(data).to_dict()
+
+    def map_prep():
+        map_agg, _ = prepare_map_data(state['by_country'])
+        return map_deck(*map_layer_payload(map_agg)).to_json()
+
+    def distribution():
+        return percentiles(band_matrix(state['timeseries']))
+
+    yield 'parse', parse
+    yield 'load_cold', load_cold
+    yield 'load_cached', load_cached
+    yield 'make_tables', tables
+    state['selection'] = selection(state['raw'])
+    yield 'load_partition', load_partition
+    check_partition_load(path, load_partition())
+    yield 'filter_mask', filter_mask
+    yield 'filter_index_build', index_build
+    yield 'filter_index_select', index_select
+    yield 'engine_build', engine_build
+    yield 'rollup_cold', rollup_cold
+    rollup_memo()  # fill the memo: the next stage measures hits only
+    yield 'rollup_memo', rollup_memo
+    yield 'cube_build', cube_build
+    yield 'cube_rollup', cube_rollup
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        yield 'duckdb_rollup', duckdb_rollup
+    yield 'trends', trends
+    yield 'line_chart_prep', line_prep
+    yield 'bar_chart_prep', bar_prep
+    yield 'map_chart_prep', map_prep
+    yield 'distribution', distribution
+
+
+def run(sizes, repeat=1, memory=True, results_path=RESULTS_PATH, data_dir=DATA_DIR, seed=0):
+    """Benchmark every stage for each size and append the results.
+
+    Returns:
+    --------
+    list of dict : One record per (size, stage)
+    """
+    run_meta = {
+        'run_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+    records = []
+    for size in sizes:
+        n_rows = parse_size(size)
+        path = os.path.join(data_dir, size.lower(), 'corp_entier.csv')
+        if not os.path.exists(path):
+            print(f"Generating {n_rows:,} rows in {path} ...")
+            generate(path, n_rows, seed=seed)
+
+        for stage, func in pipeline_stages(path):
+            _, timings, peak = measure(func, repeat=repeat, memory=memory)
+            record = dict(run_meta, size=size, rows=n_rows, stage=stage,
+                          seconds=min(timings), seconds_all=timings, peak_bytes=peak)
+            records.append(record)
+            peak_text = f"{peak / 1e6:10.1f} MB" if peak is not None else "          -"
+            print(f"{size:>6} {stage:<22} {min(timings):10.4f} s {peak_text}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+    with open(results_path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=list(DEFAULT_SIZES),
+                        help="dataset sizes, e.g. 10k 1m 10m")
+    parser.add_argument('--repeat', type=int, default=1, help="timed runs per stage (best is kept)")
+    parser.add_argument('--skip-memory', action='store_true', help="do not run the tracemalloc pass")
+    parser.add_argument('--out', default=RESULTS_PATH, help="JSONL file the results are appended to")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="folder for the generated CSV files")
+    parser.add_argument('--clean', action='store_true', help="delete the generated CSV files afterwards")
+    args = parser.parse_args()
+
+    # Synthetic regions have no map coordinates: that is expected here
+    warnings.filterwarnings('ignore', message='No coordinates for')
+    run(args.sizes, repeat=args.repeat, memory=not args.skip_memory,
+        results_path=args.out, data_dir=args.data_dir)
+    if args.clean:
+        shutil.rmtree(args.data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
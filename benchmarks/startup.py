@@ -0,0 +1,125 @@
+"""Cold-start budget check: time from a fresh interpreter to the first KPI.
+
+Each run starts a new Python process that runs the import statements of
+app.py (read from its source), loads the data and computes the KPI summary shown at the top of
+the dashboard (what a new Streamlit worker does before its first render).
+The check fails (exit status 1) when the best run exceeds the budget, or
+when a plotting backend that is only needed by the charts (altair or
+pydeck) was imported before the first KPI.
+
+Usage:
+    python -m benchmarks.startup --runs 5 --budget 3.0
+"""
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.run import RESULTS_PATH, git_commit
+
+
+DEFAULT_BUDGET = 3.0
+
+# Imported lazily by utils.viz: must not be loaded before the first chart
+DEFERRED_MODULES = ('altair', 'pydeck')
+
+# Executed in the child process; prints one JSON line
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+import app_modules
+imported = time.perf_counter()
+from utils.cube import CubeEngine
+from utils.store import DataStore
+store = DataStore(sys.argv[1])
+store.refresh()
+engine = CubeEngine(store.partials())
+summary = engine.totals(labels=('E (effective dose)',))
+done = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - start,
+    'first_kpi_s': done - start,
+    'loaded': [m for m in sys.argv[2:] if m in sys.modules],
+}))
+"""
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+def app_imports(path=APP_PATH):
+    """Return the top-level import statements of app.py, in order (read from its source)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def cold_start(data_dir):
+    """Run one fresh process and return its timings (seconds).
+
+    Returns:
+    --------
+    dict : 'process_s' (wall time of the whole process, interpreter start
+        included), 'import_s', 'first_kpi_s' (both measured in the child
+        from its first statement) and 'loaded' (deferred modules found in
+        sys.modules at the first KPI)
+    """
+    code = CHILD.replace('import app_modules', '\n'.join(app_imports()))
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-c', code, data_dir, *DEFERRED_MODULES], capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        # Streamlit logs "No runtime found" warnings: only show them on failure
+        raise RuntimeError(proc.stderr)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['process_s'] = elapsed
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help="fresh processes started (best is kept)")
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help="maximum seconds from process start to the first KPI")
+    parser.add_argument('--data-dir', default='data', help="folder holding the CSV exports")
+    parser.add_argument('--out', default=RESULTS_PATH, help="JSONL file the result is appended to")
+    args = parser.parse_args()
+
+    runs = [cold_start(args.data_dir) for _ in range(args.runs)]
+    best = min(runs, key=lambda r: r['process_s'])
+    loaded = sorted({m for r in runs for m in r['loaded']})
+    print(f"imports      {best['import_s']:8.3f} s")
+    print(f"first KPI    {best['first_kpi_s']:8.3f} s")
+    print(f"process      {best['process_s']:8.3f} s  (budget {args.budget:.3f} s)")
+
+    record = {
+        'commit': git_commit(),
+        'stage': 'cold_start',
+        'seconds': best['process_s'],
+        'seconds_all': [r['process_s'] for r in runs],
+        'import_s': best['import_s'],
+        'first_kpi_s': best['first_kpi_s'],
+        'budget_s': args.budget,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+
+    failed = False
+    if loaded:
+        print(f"FAIL: imported before the first KPI: {', '.join(loaded)}")
+        failed = True
+    if best['process_s'] > args.budget:
+        print("FAIL: cold start over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
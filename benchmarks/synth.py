@@ -0,0 +1,148 @@
+"""Synthetic dosimetry exports for benchmarking.
+
+Writes `corp_entier.csv` files with the same header, separator and value
+formats as the real export, at any size, with more countries, years,
+sectors and labels than the bundled file.
+
+Usage:
+    python -m benchmarks.synth --rows 1000000 --out benchmarks/data/1m
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.countries import COUNTRIES
+from utils.schema import DOSE_BANDS
+
+
+HEADER = [
+    'country', 'year', 'sector', 'subsector', 'label',
+    'collective_dose_total', 'average_dose_monitored', 'average_dose_exposed',
+    'total_workers_number',
+] + list(DOSE_BANDS)
+
+SECTORS = [
+    'ALL MONITORED WORKERS', 'MEDICAL FIELD', 'INDUSTRY', 'NUCLEAR FIELD',
+    'RESEARCH AND EDUCATION', 'NATURAL SOURCES', 'TRANSPORT', 'OTHER FIELDS',
+]
+
+SUBSECTORS = ['Diagnostic radiology', 'Radiotherapy', 'Nuclear medicine', 'Dental radiology']
+
+LABELS = [
+    'E (effective dose)', 'Hp10n (external dose neutrons)',
+    'Hp10 (external dose photons)', 'I (internal dose)',
+]
+
+# Share of missing values in the numeric columns (the real file has many)
+MISSING_RATE = 0.08
+
+
+def dimensions_for(n_rows):
+    """Return (countries, years, sectors) scaled with the number of rows."""
+    real = [country.name for country in COUNTRIES]
+    n_countries = int(np.clip(np.sqrt(n_rows) / 5, len(real), 600))
+    countries = real + [f"Region {i:03d}" for i in range(n_countries - len(real))]
+    n_years = int(np.clip(np.log10(max(n_rows, 10)) * 8, 13, 60))
+    years = list(range(2023 - n_years, 2023))
+    n_extra = int(np.clip(np.log10(max(n_rows, 10)) - 4, 0, 4)) * 4
+    sectors = SECTORS + [f"SECTOR {i:02d}" for i in range(n_extra)]
+    return countries, years, sectors
+
+
+def make_chunk(n_rows, countries, years, sectors, rng):
+    """Return one chunk of synthetic rows as a DataFrame (HEADER columns)."""
+    sector = np.asarray(sectors, dtype=object)[rng.integers(0, len(sectors), n_rows)]
+    subsector = np.where(
+        (sector == 'MEDICAL FIELD') & (rng.random(n_rows) < 0.6),
+        np.asarray(SUBSECTORS, dtype=object)[rng.integers(0, len(SUBSECTORS), n_rows)],
+        None,
+    )
+    bands = rng.lognormal(mean=[7, 6, 5, 2.5, 1.2, 0.5, 0.2], sigma=1.5, size=(n_rows, len(DOSE_BANDS)))
+    bands = np.floor(bands)
+    workers = bands.sum(axis=1)
+    avg_monitored = rng.gamma(1.5, 0.3, n_rows)
+    df = pd.DataFrame({
+        'country': np.asarray(countries, dtype=object)[rng.integers(0, len(countries), n_rows)],
+        'year': np.asarray(years)[rng.integers(0, len(years), n_rows)],
+        'sector': sector,
+        'subsector': subsector,
+        'label': np.asarray(LABELS, dtype=object)[rng.integers(0, len(LABELS), n_rows)],
+        'collective_dose_total': np.round(workers * avg_monitored / 1000, 3),
+        'average_dose_monitored': np.round(avg_monitored, 3),
+        'average_dose_exposed': np.round(avg_monitored * rng.uniform(1.5, 3, n_rows), 3),
+        'total_workers_number': workers,
+    })
+    for i, band in enumerate(DOSE_BANDS):
+        df[band] = bands[:, i]
+
+    numeric = HEADER[5:]
+    missing = rng.random((n_rows, len(numeric))) < MISSING_RATE
+    for i, col in enumerate(numeric):
+        df[col] = df[col].mask(missing[:, i])
+    # Counts are written as integers (empty when missing), like the real file
+    for col in ['total_workers_number'] + list(DOSE_BANDS):
+        df[col] = df[col].astype('Int64')
+    return df[HEADER]
+
+
+def generate(path, n_rows, seed=0, chunk_rows=500_000):
+    """Write a synthetic `corp_entier.csv`-like export of `n_rows` rows.
+
+    Rows are generated and appended in chunks so memory stays bounded
+    whatever the size.
+
+    Parameters:
+    -----------
+    path : str
+        Output CSV path (parent folders are created)
+    n_rows : int
+        Number of data rows
+    seed : int
+        Random seed (same seed and size give the same file)
+    chunk_rows : int
+        Rows generated per chunk
+
+    Returns:
+    --------
+    str : `path`
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    countries, years, sectors = dimensions_for(n_rows)
+
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(';'.join(HEADER) + '\n')
+        while written < n_rows:
+            n = min(chunk_rows, n_rows - written)
+            make_chunk(n, countries, years, sectors, rng).to_csv(
+                f, sep=';', header=False, index=False, float_format='%.3f'
+            )
+            written += n
+    return path
+
+
+def parse_size(text):
+    """Parse sizes such as '10k', '1m', '10M' or '2500' into a row count."""
+    text = text.strip().lower()
+    factor = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if factor > 1 else text) * factor)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', default='10k', help="number of rows, e.g. 10k, 1m, 10m")
+    parser.add_argument('--out', default=None, help="output folder (default: benchmarks/data/<rows>)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    out_dir = args.out or os.path.join('benchmarks', 'data', args.rows.lower())
+    path = generate(os.path.join(out_dir, 'corp_entier.csv'), parse_size(args.rows), seed=args.seed)
+    print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import streamlit as st
+from sections.overview import show_kpis
+from utils.units import section_unit
+from utils.viz import bar_chart, line_chart
+
+
+TIMESERIES_COLUMNS = ['year', 'collective_dose_total', 'average_dose_monitored', 'total_workers_number']
+COUNTRY_COLUMNS = ['country', 'collective_dose_total', 'average_dose_monitored', 'average_dose_exposed',
+                   'total_workers_number']
+
+
+def _describe(filters):
+    """One-line summary of a selection."""
+    sectors = 'All sectors' if filters['sectors'] is None else ', '.join(filters['sectors'])
+    label = 'every label' if filters['labels'] is None else ', '.join(filters['labels'])
+    first, last = filters['year_range']
+    return f"{sectors} - {first}-{last} - {len(filters['countries'])} countries - {label}"
+
+
+def _side(engine, filters):
+    """KPIs, time series and per-country table of one selection."""
+    return {
+        'summary': engine.totals(**filters),
+        'overall': engine.totals(labels=filters['labels']),
+        'timeseries': engine.rollup('year', **filters)[TIMESERIES_COLUMNS],
+        'by_country': engine.rollup('country', **filters)[COUNTRY_COLUMNS]
+        .sort_values('collective_dose_total', ascending=False),
+    }
+
+
+def _deltas(table_a, table_b, key, value):
+    """Values of both selections per `key` and their difference (B - A)."""
+    merged = table_a[[key, value]].merge(table_b[[key, value]], on=key, how='outer', suffixes=(' A', ' B'))
+    merged['B - A'] = merged[f"{value} B"] - merged[f"{value} A"]
+    return merged.sort_values(key, ignore_index=True)
+
+
+def _comparison(engine, filters, filters_b):
+    # Both sides go through the shared engine: rollups also needed by the
+    # other side or by the sections below (selection A) come from its memo
+    side_a = _side(engine, filters)
+    side_b = side_a if filters_b == filters else _side(engine, filters_b)
+    return {
+        'A': side_a,
+        'B': side_b,
+        'by_year': _deltas(side_a['timeseries'], side_b['timeseries'], 'year', 'collective_dose_total'),
+        'by_country': _deltas(side_a['by_country'], side_b['by_country'], 'country', 'average_dose_monitored'),
+    }
+
+
+@section_unit(depends_on=('engine', 'filters', 'filters_b'), compute=_comparison)
+def show_comparison(payload, engine, filters, filters_b):
+    """Render selections A and B side by side, then their differences.
+
+    Selection B shows its KPIs as differences with selection A.
+    """
+    st.header(":left_right_arrow: Comparison of two selections")
+
+    columns = st.columns(2)
+    for column, side, side_filters in ((columns[0], 'A', filters), (columns[1], 'B', filters_b)):
+        data = payload[side]
+        with column:
+            st.subheader(f"Selection {side}")
+            st.caption(_describe(side_filters))
+            if data['summary']['rows'] == 0:
+                st.warning(":x: No data for this selection")
+                continue
+            show_kpis(data['summary'], data['overall'], reference=payload['A']['summary'] if side == 'B' else None)
+            line_chart(data['timeseries'])
+            bar_chart(data['by_country'])
+
+    st.subheader("Differences (B - A)")
+    c1, c2 = st.columns(2)
+    with c1:
+        st.caption("Total collective dose per year (Sv)")
+        st.dataframe(payload['by_year'], use_container_width=True, hide_index=True)
+    with c2:
+        st.caption("Average monitored dose per country (Sv)")
+        st.dataframe(payload['by_country'], use_container_width=True, hide_index=True)
+
+    st.markdown("---")
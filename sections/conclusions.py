@@ -1,36 +1,69 @@
 import streamlit as st
+from utils.trends import analyze, outliers, trend_direction
+from utils.units import section_unit
 
-def show_resume(filtered_data, year_range, selected_countries, selected_sector):
+@section_unit(depends_on=('summary', 'year_range', 'selected_countries', 'selected_sector', 'selected_label'))
+def show_resume(_, summary, year_range, selected_countries, selected_sector, selected_label):
 
-    if filtered_data.empty:
+    if summary['rows'] == 0:
         st.warning(":x: No data available to analyze for this conclusion.")
         return
 
-    avg_dose = filtered_data['collective_dose_total'].mean()
-    total_workers = int(filtered_data['total_workers_number'].sum())
+    avg_dose = summary['collective_dose_mean']
+    total_workers = int(summary['total_workers_number'])
 
     st.subheader("Key Findings")
     st.success(f"""
     - Analysis period: **{year_range[0]} - {year_range[1]}**
     - Countries analyzed: **{', '.join(selected_countries)}**
     - Selected sector: **{selected_sector}**
+    - Dose label: **{selected_label or 'All'}**
     - Average collective dose: **{avg_dose:.3f} Sv**
     - Total number of monitored workers: **{total_workers:,}**
     """)
 
-def show_conclusions():
+def _interpretation(engine, filters):
+    """Trend counts and high-level countries of the selection, for the interpretation text."""
+    overall = analyze(engine.rollup('year', **filters), 'collective_dose_total', row=None)
+    stats = analyze(engine.rollup(('country', 'year'), **filters), 'average_dose_monitored')
+    directions = trend_direction(stats['change'])
+    return {
+        'overall': trend_direction(overall['change'])[0],
+        'counts': {d: int((directions == d).sum()) for d in ('decrease', 'stable', 'increase')},
+        'high': [country for country, _ in outliers(stats)],
+    }
+
+
+@section_unit(depends_on=('engine', 'filters'), compute=_interpretation)
+def show_conclusions(findings, engine, filters):
     st.header("Conclusions & Recommendations")
     
     st.subheader("Overall interpretation")
-    st.markdown("""
-    A general trend of decrease/stability/increase is observed depending on the selected filters.  
-    Some countries still show higher levels, which may indicate:  
-    - Uneven radiation protection practices,  
-    - Differences in activity volumes or monitoring systems,  
-    - Possible sub-optimization of medical protocols.
+    if findings['overall'] is None:
+        st.warning(":x: Not enough years selected to observe a trend.")
+        return
 
+    counts = findings['counts']
+    lines = [
+        f"A general trend of **{findings['overall']}** of the collective dose is observed for the selected filters.  ",
+        f"Among the selected countries, the average monitored dose decreases for {counts['decrease']}, "
+        f"is stable for {counts['stable']} and increases for {counts['increase']}.  ",
+    ]
+    if findings['high']:
+        names = ', '.join(f"`{country}`" for country in findings['high'])
+        lines += [
+            f"Some countries still show higher levels ({names}), which may indicate:  ",
+            "- Uneven radiation protection practices,  ",
+            "- Differences in activity volumes or monitoring systems,  ",
+            "- Possible sub-optimization of medical protocols.",
+        ]
+    else:
+        lines.append("No country stands out with a markedly higher average monitored dose.")
+    st.markdown("\n".join(lines))
+
+    st.markdown("""
     ### Potential recommendations for concerned countries:
     - Strengthen radiation protection training in the medical sector,
     - Harmonize standards across European countries,
     - More closely monitor areas with high collective dose.
-    """)
\ No newline at end of file
+    """)
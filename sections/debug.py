@@ -0,0 +1,55 @@
+import pandas as pd
+import streamlit as st
+
+from utils import instrument
+from utils.shared import session_memory
+from utils.units import unit_stats
+
+
+def show_debug_panel(engine):
+    """Sidebar panel with the per-stage timings and cache statistics.
+
+    Shown only when profiling is enabled (DASHBOARD_PROFILE=1). Statistics
+    are process-wide and cumulative since the start or the last reset; the
+    panel reflects the stages recorded up to the point it is drawn.
+
+    Parameters:
+    -----------
+    engine : AggregationEngine
+        Shared engine whose rollup memo statistics are displayed
+    """
+    with st.expander(":stopwatch: Performance", expanded=False):
+        stats = instrument.stage_stats()
+        if stats:
+            table = pd.DataFrame.from_dict(stats, orient='index')
+            table['mean_ms'] = table['total_s'] / table['calls'] * 1000
+            table['max_ms'] = table['max_s'] * 1000
+            table['peak_MB'] = table['peak_bytes'] / 1e6
+            table = table[['calls', 'mean_ms', 'max_ms', 'peak_MB']].sort_values('mean_ms', ascending=False)
+            st.dataframe(table.round(2), use_container_width=True)
+        else:
+            st.caption("No stage recorded yet.")
+
+        st.markdown("**Caches**")
+        rows = [
+            {'cache': name, 'hits': entry['hits'], 'misses': entry['misses']}
+            for name, entry in instrument.cache_stats().items()
+        ]
+        memo = engine.cache_info()
+        rows.append({'cache': 'rollup memo', 'hits': memo['hits'], 'misses': memo['misses']})
+        st.dataframe(pd.DataFrame(rows).set_index('cache'), use_container_width=True)
+
+        units = unit_stats()
+        if units:
+            st.markdown("**Sections (this session)**")
+            st.dataframe(pd.DataFrame.from_dict(units, orient='index'), use_container_width=True)
+
+        st.markdown("**Session memory**")
+        sizes = session_memory(st.session_state, shared=(engine,))
+        st.dataframe(pd.Series(sizes, name='kB').div(1e3).round(1), use_container_width=True)
+
+        if instrument.PROFILE_LOG:
+            st.caption(f"Stage timings are also appended to `{instrument.PROFILE_LOG}`.")
+        if st.button("Reset statistics"):
+            instrument.reset()
+            st.rerun()
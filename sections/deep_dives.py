@@ -1,61 +1,230 @@
 import streamlit as st
-from utils.viz import bar_chart, line_chart, map_chart
+import numpy as np
+import pandas as pd
+from utils.viz import bar_chart, line_chart, map_chart, distribution_chart
+from utils.dist import band_matrix, percentiles
+from utils.trends import analyze, outliers, rising_years, trend_direction, zscores, OUTLIER_Z
+from utils.units import section_unit
 
-def show_deep_dives(filtered_data):
+# Every deep-dive unit reads the shared engine and the current selection
+# ('countries', 'year_range', 'sectors' and 'labels' keyword arguments of
+# AggregationEngine.rollup)
+FILTER_INPUTS = ('engine', 'filters')
+
+
+def show_deep_dives(context):
+    """Render the time series, country comparison, distribution and map units.
+
+    Parameters:
+    -----------
+    context : dict
+        Dashboard context built in app.py (see `utils.units`)
+    """
     st.header("In-depth analysis : Comparisons and disparities")
     
     # 1. Trends over time
-    st.subheader(":calendar: Dose time series")
-    # Use filtered_data directly (it already respects the 'All' selection)
-    timeseries_filtered = filtered_data.groupby('year').agg({
-        'collective_dose_total': 'sum',
-        'average_dose_monitored': 'mean',
-        'total_workers_number': 'sum'
-    }).reset_index().sort_values('year')
+    show_timeseries(context)
+    st.markdown("---")
+    
+    st.markdown("#### Now, let's explore how different countries compare in terms of radiation exposure for monitored workers.")
+    # 2. Compare regions (countries)
+    show_country_comparison(context)
+    st.markdown("---")
+
+    st.markdown("#### How are individual doses spread among workers? The dataset counts workers per annual dose band, from which we estimate percentiles.")
+    # 3. Dose distribution
+    show_distribution(context)
+
+    st.markdown("---")
+
+    st.markdown("#### Finally, let's visualize the geographic distribution of radiation exposure using an interactive map.")
+
+    # 4. Map view
+    show_map(context)
+    st.markdown("---")
+
+
+def _join(items):
+    """Join texts as "A, B and C"."""
+    items = list(items)
+    return items[0] if len(items) == 1 else f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+def _timeseries_findings(timeseries):
+    """Findings text on the collective dose trend and the yearly increases of the average dose."""
+    dose = analyze(timeseries, 'collective_dose_total', row=None)
+    direction = trend_direction(dose['change'])[0]
+    if direction is None:
+        return []
+
+    first, last = dose['years'][0], dose['years'][-1]
+    slope = dose['slopes'][0]
+    if direction == 'decrease':
+        findings = [f"As we can see above, the collective dose decreases over `{first}`-`{last}` "
+                    f"({slope:+.2f} Sv per year), which is a positive trend indicating improved safety "
+                    f"measures and reduced exposure levels for monitored workers."]
+    elif direction == 'increase':
+        findings = [f"As we can see above, the collective dose increases over `{first}`-`{last}` "
+                    f"({slope:+.2f} Sv per year), which calls for a closer look at the exposure "
+                    f"levels of monitored workers."]
+    else:
+        findings = [f"As we can see above, the collective dose remains stable over `{first}`-`{last}`."]
+
+    rising = rising_years(analyze(timeseries, 'average_dose_monitored', row=None))
+    if rising:
+        years = _join(f"`{year}` ({delta:+.3f} Sv)" for year, delta in sorted(rising))
+        findings.append(f"{'But w' if direction == 'decrease' else 'W'}e can see an increase in the "
+                        f"average monitored dose in {years}.")
+    return findings
+
 
+def _timeseries(engine, filters):
+    # Memoized rollup of the current selection (it already respects the 'All' selection)
+    timeseries = engine.rollup('year', **filters)[[
+        'year', 'collective_dose_total', 'average_dose_monitored', 'total_workers_number'
+    ]]
+    return timeseries, _timeseries_findings(timeseries)
+
+
+@section_unit(depends_on=FILTER_INPUTS, compute=_timeseries)
+def show_timeseries(payload, engine, filters):
+    st.subheader(":calendar: Dose time series")
+    timeseries_filtered, findings = payload
     if not timeseries_filtered.empty:
         line_chart(timeseries_filtered)
+        for finding in findings:
+            st.markdown(f"#### {finding}")
     else:
         st.warning(":x: No data for the selected period")
 
-    st.markdown("#### As we can see above, the dose decreases over time, which is a positive trend indicating improved safety measures and reduced exposure levels for monitored workers globally.")
-    st.markdown("#### But we can see that in `2018`, there is a slight increase in the average monitored dose")
-    st.markdown("---")
-    
-    st.markdown("#### Now, let's explore how different countries compare in terms of radiation exposure for monitored workers.")
-    # 2. Compare regions (countries)
-    st.subheader(":globe_with_meridians: Comparison by country")
-    # Use filtered_data directly (it already respects the 'All' selection)
-    by_country_filtered = filtered_data.groupby('country').agg({
-        'collective_dose_total': 'sum',
-        'average_dose_monitored': 'mean',
-        'average_dose_exposed': 'mean',
-        'total_workers_number': 'sum'
-    }).reset_index().sort_values('collective_dose_total', ascending=False)
 
+def _country_findings(by_country_year):
+    """Findings text on the country outliers and trends of the average monitored dose."""
+    stats = analyze(by_country_year, 'average_dose_monitored')
+    if len(stats['countries']) < 2:
+        return []
+
+    high = outliers(stats)[:3]
+    if high:
+        names = _join(f"`{country}`" for country, _ in high)
+        findings = [f"As we can see, in {names}, the average monitored dose is particularly high compared "
+                    f"to other countries (more than {OUTLIER_Z:g} standard deviations above the mean), "
+                    f"meaning that workers there may be at a greater risk of radiation exposure."]
+    else:
+        findings = [f"No country stands out: every average monitored dose is within {OUTLIER_Z:g} "
+                    f"standard deviations of the mean of the selected countries."]
+
+    # Largest relative changes over the period, in each direction
+    direction = trend_direction(stats['change'])
+    change = stats['change']
+    rising = np.flatnonzero(direction == 'increase')
+    rising = rising[np.argsort(-change[rising], kind='stable')][:3]
+    falling = np.flatnonzero(direction == 'decrease')
+    falling = falling[np.argsort(change[falling], kind='stable')][:3]
+    period = f"Over `{stats['years'][0]}`-`{stats['years'][-1]}`"
+    if len(falling):
+        names = _join(f"`{stats['countries'][i]}` ({change[i]:+.1%} per year)" for i in falling)
+        findings.append(f"{period}, the average monitored dose falls the most in {names}.")
+    if len(rising):
+        names = _join(f"`{stats['countries'][i]}` ({change[i]:+.1%} per year)" for i in rising)
+        subject = 'it' if len(falling) else 'the average monitored dose'
+        findings.append(f"{period}, {subject} rises the most in {names}, which may point to areas "
+                        f"for improvement in radiation safety protocols.")
+    return findings
+
+
+def _by_country(engine, filters):
+    # Memoized rollup of the current selection (it already respects the 'All' selection)
+    by_country = engine.rollup('country', **filters)[[
+        'country', 'collective_dose_total', 'average_dose_monitored', 'average_dose_exposed', 'total_workers_number'
+    ]].sort_values('collective_dose_total', ascending=False)
+    return by_country, _country_findings(engine.rollup(('country', 'year'), **filters))
+
+
+@section_unit(depends_on=FILTER_INPUTS, compute=_by_country)
+def show_country_comparison(payload, engine, filters):
+    st.subheader(":globe_with_meridians: Comparison by country")
+    by_country_filtered, findings = payload
     if not by_country_filtered.empty:
         bar_chart(by_country_filtered)
+        for finding in findings:
+            st.markdown(f"#### {finding}")
     else:
         st.warning(":x: No data for the selected period")
 
-    st.markdown("#### The bar chart above highlights the disparities in average monitored doses across different countries. Some countries exhibit significantly higher exposure levels, indicating potential areas for improvement in radiation safety protocols.")
-    st.markdown("#### As we can see, in `Hungary`, the average monitored dose is particularly high compared to other countries, meaning that workers in Hungary may be at a greater risk of radiation exposure.")
 
+def _distribution(engine, filters):
+    # Band counts summed for the selection, then per year in one vectorized pass
+    bands = engine.totals(**filters)['bands']
+    by_year = engine.rollup('year', **filters)
+    by_year_pct = pd.DataFrame(percentiles(band_matrix(by_year)), columns=['p50', 'p95', 'p99'])
+    by_year_pct.insert(0, 'year', by_year['year'].to_numpy())
+    return bands, by_year_pct.dropna()
 
-    st.markdown("---")
 
-    st.markdown("#### Finally, let's visualize the geographic distribution of radiation exposure using an interactive map.")
+@section_unit(depends_on=FILTER_INPUTS, compute=_distribution)
+def show_distribution(payload, engine, filters):
+    st.subheader(":bar_chart: Dose distribution")
+    # Section control: moving it reruns this section only
+    threshold = st.slider(
+        "Dose threshold (mSv)",
+        min_value=1.0,
+        max_value=20.0,
+        value=6.0,
+        step=0.5,
+        help="Workers above this annual dose are counted below (6 mSv: category A classification level)"
+    )
+    bands, by_year_pct = payload
+    distribution_chart(bands, threshold, by_year_pct)
 
-    # 3. Map view
+
+@section_unit(depends_on=FILTER_INPUTS)
+def show_map(_, engine, filters):
     st.subheader(":world_map: Map view")
-    # Use filtered_data directly (it already respects the 'All' selection)
-    geo_filtered = filtered_data.copy()
+    # Section control: a single year for the map only, rerunning this section only
+    first_year, last_year = filters['year_range']
+    map_year = st.selectbox(
+        "Map year",
+        ['Selected range'] + list(range(last_year, first_year - 1, -1)),
+        index=0,
+        help="Show a single year on the map without changing the other charts"
+    )
+    map_filters = filters if map_year == 'Selected range' else dict(filters, year_range=(map_year, map_year))
+    # Same per-country rollup as the comparison above (served from the memo)
+    geo_filtered = engine.rollup('country', **map_filters)
 
     if not geo_filtered.empty:
         map_chart(geo_filtered)
+        for finding in _map_findings(geo_filtered):
+            st.markdown(f"#### {finding}")
     else:
         st.warning(":x: No data for the selected period")
 
-    st.markdown("#### As we can see, `France` and `Germany` have a really high number of monitored workers but also a relatively low average monitored dose, indicating effective radiation safety measures in place.")
-    st.markdown("#### In contrast, countries like `Hungary` and `Finland` show higher average monitored doses, suggesting potential areas for improvement in radiation protection practices.")
-    st.markdown("---")
+
+def _map_findings(by_country):
+    """Findings text comparing the largest workforces with the highest average doses."""
+    if len(by_country) < 2:
+        return []
+    dose = by_country['average_dose_monitored'].to_numpy(dtype='float64', na_value=np.nan)
+    workers = by_country['total_workers_number'].to_numpy(dtype='float64', na_value=np.nan)
+    countries = by_country['country'].to_numpy(dtype=object)
+    median = np.nanmedian(dose)
+
+    findings = []
+    largest = np.argsort(-np.nan_to_num(workers, nan=-np.inf), kind='stable')[:2]
+    names = _join(f"`{countries[i]}`" for i in largest)
+    if (dose[largest] <= median).all():
+        findings.append(f"As we can see, {names} have the highest numbers of monitored workers but an "
+                        f"average monitored dose at or below the median, indicating effective radiation "
+                        f"safety measures in place.")
+    else:
+        findings.append(f"As we can see, {names} have the highest numbers of monitored workers.")
+
+    z = zscores(dose)
+    high = [i for i in np.argsort(-np.nan_to_num(z, nan=-np.inf), kind='stable')[:2] if z[i] >= OUTLIER_Z / 2]
+    high = [i for i in high if i not in largest]
+    if high:
+        names = _join(f"`{countries[i]}`" for i in high)
+        findings.append(f"In contrast, countries like {names} show higher average monitored doses, "
+                        f"suggesting potential areas for improvement in radiation protection practices.")
+    return findings
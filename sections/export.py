@@ -0,0 +1,65 @@
+import functools
+
+import streamlit as st
+from utils.config import DATA_DIR
+from utils.export import FORMATS, export_dir, export_file, export_key, frame_chunks, open_export
+from utils.units import section_unit
+from utils.viz import prepare_map_data
+
+
+def _row_chunks(engine, dataset, filters):
+    """Return a callable yielding the filtered rows in chunks (None without raw rows)."""
+    if dataset is not None:
+        # Slices of the shared rows: no copy of the selection is made up front
+        return lambda: frame_chunks(dataset.view(**filters))
+    if hasattr(engine, 'iter_rows'):
+        # DuckDB backend: record batches of the filtered scan
+        return lambda: engine.iter_rows(**filters)
+    return None
+
+
+def _tables(engine, dataset, filters):
+    """Exportable tables: {name: (button label, callable yielding the frames or None)}."""
+    return {
+        'rows': ("Filtered rows", _row_chunks(engine, dataset, filters)),
+        'timeseries': ("Time series", lambda: frame_chunks(engine.rollup('year', **filters))),
+        'by_country': ("By country", lambda: frame_chunks(
+            engine.rollup('country', **filters).sort_values('collective_dose_total', ascending=False))),
+        'map': ("Map aggregates", lambda: frame_chunks(prepare_map_data(engine.rollup('country', **filters))[0])),
+    }
+
+
+def _download(chunks, key, fmt):
+    # Run by Streamlit when the button is clicked, outside of the script run
+    return open_export(export_file(chunks, key, fmt, export_dir(DATA_DIR)))
+
+
+@section_unit(depends_on=('engine', 'dataset', 'filters', 'data_files'))
+def show_export(_, engine, dataset, filters, data_files):
+    """Download buttons for the filtered rows and the derived tables.
+
+    Nothing is computed before a button is clicked; the file is then written
+    in chunks and cached (see `utils.export`).
+    """
+    st.header(":inbox_tray: Export the data")
+    # Section control: changing the format reruns this section only
+    fmt = st.radio("Format", list(FORMATS), horizontal=True, format_func=str.upper,
+                   help="CSV (';' separated, UTF-8) or Parquet (typed columns, compressed)")
+    extension, mime = FORMATS[fmt]
+
+    columns = st.columns(4)
+    for column, (name, (label, chunks)) in zip(columns, _tables(engine, dataset, filters).items()):
+        with column:
+            if chunks is None:
+                st.button(label, disabled=True, key=f"export_{name}",
+                          help="No raw rows in streaming mode: export the aggregated tables instead")
+                continue
+            st.download_button(
+                label,
+                data=functools.partial(_download, chunks, export_key(data_files, name, filters, fmt), fmt),
+                file_name=f"dosimetry_{name}{extension}",
+                mime=mime,
+                key=f"export_{name}",
+                on_click='ignore',
+                icon=":material/download:",
+            )
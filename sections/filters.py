@@ -0,0 +1,80 @@
+import streamlit as st
+from utils.aggregate import label_filter, sector_filter
+
+
+def show_filters(choices, key=None):
+    """Render one set of sidebar filters.
+
+    Parameters:
+    -----------
+    choices : dict
+        Output of `utils.prep.filter_options`
+    key : str, optional
+        Prefix of the widget keys, for a second set of filters on the page
+        (None: the widgets of the main selection)
+
+    Returns:
+    --------
+    dict : 'countries', 'year_range', 'sector' and 'label' (None without
+        a label column) as chosen in the widgets
+    """
+    widget_key = (lambda name: f"{key}_{name}") if key else (lambda name: None)
+
+    # Country filter
+    all_countries = choices['countries']
+    selected_countries = st.multiselect(
+        "Country",
+        all_countries,
+        default=all_countries,
+        key=widget_key('countries'),
+        help="Select countries to display"
+    )
+
+    # Year range filter
+    min_year, max_year = choices['years']
+    year_range = st.slider(
+        "Year range",
+        min_value=min_year,
+        max_value=max_year,
+        value=(min_year, max_year),
+        key=widget_key('year_range'),
+        help="Select the period to analyse"
+    )
+
+    # Sector filter (dynamic list, 'All' first, preferred order in utils.prep)
+    selected_sector = st.selectbox(
+        "Sector",
+        choices['sectors'],
+        index=0,
+        key=widget_key('sector'),
+        help="Choose the sector to analyse (or 'All' to include every sector)"
+    )
+
+    # Dose label: every (country, year, sector) is reported once per label,
+    # so figures are shown for one label at a time (summing them would count
+    # the same workers several times)
+    labels = choices['labels']
+    selected_label = st.selectbox(
+        "Dose label",
+        labels,
+        index=0,
+        key=widget_key('label'),
+        help="Quantity the doses and worker counts refer to (effective dose by default)"
+    ) if labels else None
+
+    return {
+        'countries': selected_countries,
+        'year_range': year_range,
+        'sector': selected_sector,
+        'label': selected_label,
+    }
+
+
+def selection_filters(selection):
+    """Translate a `show_filters` selection into `AggregationEngine.rollup` keyword arguments."""
+    return {
+        'countries': selection['countries'],
+        'year_range': selection['year_range'],
+        'sectors': sector_filter(selection['sector']),
+        'labels': label_filter(selection['label']),
+    }
@@ -1,6 +1,8 @@
 import streamlit as st
+from utils.units import section_unit
 
-def show_intro():
+@section_unit()
+def show_intro(_):
     st.title("Context & Objectives")
     st.markdown("""
     #### The human body is sensitive to ionizing radiation. Excessive exposure can lead to occupational cataracts, particularly among workers in the medical (radiology, radiotherapy) or nuclear sectors.
@@ -1,34 +1,70 @@
 import streamlit as st
 import pandas as pd
+from utils.units import section_unit
 
-def show_overview(filtered_data, raw):
+@section_unit(depends_on=('summary', 'overall'))
+def show_overview(_, summary, overall):
+    """Render the KPI row.
+
+    Parameters:
+    -----------
+    summary : dict
+        KPI summary of the current selection (see `utils.aggregate.AggregationEngine.totals`)
+    overall : dict
+        KPI summary of the whole dataset (for the selected label)
+    """
     # === KPI ROW ===
     st.header(":chart_with_upwards_trend: Key indicators")
+    show_kpis(summary, overall)
+
+    st.markdown("---")
+
+
+def show_kpis(summary, overall, reference=None):
+    """Render the three KPI metrics of a selection.
+
+    Parameters:
+    -----------
+    summary : dict
+        KPI summary of the selection
+    overall : dict
+        KPI summary of the whole dataset (for the selection's label)
+    reference : dict, optional
+        KPI summary of another selection: every metric then shows its
+        difference with it instead of the share of the total
+    """
     c1, c2, c3 = st.columns(3)
 
     with c1:
-        total_dose = filtered_data['collective_dose_total'].sum()
+        total_dose = summary['collective_dose_total']
         st.metric(
             ":syringe: Total collective dose",
             f"{total_dose:.3f} Sv",
-            help="Sum of collective doses for monitored workers"
+            help="Sum of collective doses for monitored workers",
+            delta=None if reference is None else f"{total_dose - reference['collective_dose_total']:+.3f} Sv",
+            delta_color="inverse"
         )
 
     with c2:
-        avg_dose = filtered_data['average_dose_monitored'].mean()
+        avg_dose = summary['average_dose_monitored']
         st.metric(
             ":warning: Average monitored dose",
             f"{avg_dose:.3f} Sv",
-            help="Average dose among monitored workers"
+            help="Average dose among monitored workers",
+            delta=None if reference is None or pd.isna(avg_dose) or pd.isna(reference['average_dose_monitored'])
+            else f"{avg_dose - reference['average_dose_monitored']:+.3f} Sv",
+            delta_color="inverse"
         )
 
     with c3:
-        total_workers = filtered_data['total_workers_number'].sum()
+        total_workers = summary['total_workers_number']
+        if reference is None:
+            delta = f"{((total_workers / overall['total_workers_number']) * 100):.1f}% of total"
+        else:
+            delta = f"{int(total_workers - reference['total_workers_number']):+,}"
         st.metric(
             ":busts_in_silhouette: Exposed workers",
             f"{int(total_workers):,}",
             help="Total number of monitored workers",
-            delta=f"{((total_workers / raw['total_workers_number'].sum()) * 100):.1f}% of total"
+            delta=delta
         )
-
-    st.markdown("---")
@@ -0,0 +1,36 @@
+import streamlit as st
+
+
+def show_warmup(warmup):
+    """Placeholder page shown while the background warm-up loads the data.
+
+    The progress is refreshed every second, and the whole page is rerun as
+    soon as the data can be served; nothing here waits for the warm-up.
+
+    Parameters:
+    -----------
+    warmup : utils.warmup.Warmup
+        Warm-up of this process (see `get_warmup` in app.py)
+    """
+    @st.fragment(run_every=1.0)
+    def progress():
+        if warmup.serving:
+            st.rerun()
+        status = warmup.status()
+        st.info(f":hourglass_flowing_sand: Preparing the data: {status['step'] or 'starting'}... "
+                f"({status['seconds'] or 0:.1f} s)")
+
+    progress()
+
+
+def show_warmup_status(warmup):
+    """Sidebar readiness line of the background warm-up."""
+    status = warmup.status()
+    if status['state'] == 'ready':
+        st.caption(f"Warm-up done in {status['seconds']:.1f} s: common views are served from the cache")
+    elif status['state'] == 'failed':
+        st.caption("Warm-up failed: views are computed on demand")
+        with st.expander("Warm-up error"):
+            st.code(status['error'])
+    else:
+        st.caption(f"Warm-up in progress: {status['step']} ({status['done']} steps, {status['seconds']:.1f} s)")
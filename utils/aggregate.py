@@ -0,0 +1,269 @@
+"""Shared aggregation engine for the dashboard views.
+
+The raw rows are reduced once to (dataset, label, country, year, sector)
+partial aggregates: for every measure, the sum and the number of non-null rows.
+Any view (time series, by country, by sector, map...) for any filter
+combination is then answered by filtering and re-summing these partials,
+which gives the same numbers as grouping the raw rows directly.
+Results are memoized per normalized filter tuple with LRU eviction.
+"""
+
+from collections import OrderedDict
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.instrument import timed
+from utils.schema import DOSE_BANDS
+
+
+DIMENSIONS = ('dataset', 'label', 'country', 'year', 'sector')
+
+# Measures aggregated with a sum (including the workers per dose band)
+SUM_COLUMNS = ('collective_dose_total', 'total_workers_number') + DOSE_BANDS
+
+# Measures aggregated with an (unweighted) mean over rows
+MEAN_COLUMNS = ('average_dose_monitored', 'average_dose_exposed')
+
+MEASURES = SUM_COLUMNS + MEAN_COLUMNS
+
+SUM_SUFFIX = '__sum'
+COUNT_SUFFIX = '__count'
+ROWS = 'rows'
+
+
+@timed()
+def build_partials(df):
+    """Reduce raw rows to (dataset, label, country, year, sector) partial aggregates.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Raw dosimetry rows (see `utils.io.load_data`)
+
+    Returns:
+    --------
+    pd.DataFrame : One row per (dataset, label, country, year, sector) with,
+        for each measure, '<col>__sum' (float64) and '<col>__count' (number
+        of non-null rows), plus the number of raw rows in 'rows'. Rows
+        without a sector (or label) are kept under a missing value; columns
+        absent from the file are treated as missing values.
+    """
+    work = df.reindex(columns=list(DIMENSIONS))
+    for col in MEASURES:
+        values = df[col].astype('float64') if col in df.columns else pd.Series(np.nan, index=df.index)
+        work[col + SUM_SUFFIX] = values
+        work[col + COUNT_SUFFIX] = values.notna().astype('int64')
+    work[ROWS] = 1
+
+    return work.groupby(list(DIMENSIONS), observed=True, dropna=False).sum().reset_index()
+
+
+def combine_partials(frames):
+    """Merge several partial frames (e.g. one per file or chunk) into one.
+
+    Parameters:
+    -----------
+    frames : list of pd.DataFrame
+        Outputs of `build_partials`
+
+    Returns:
+    --------
+    pd.DataFrame : Partials summed per (dataset, label, country, year, sector),
+        with the text dimensions stored as categoricals
+    """
+    combined = pd.concat(frames, ignore_index=True)
+    # Categories may differ between frames: group on the plain values
+    for col in DIMENSIONS:
+        if isinstance(combined[col].dtype, pd.CategoricalDtype):
+            combined[col] = combined[col].astype(object)
+    combined = combined.groupby(list(DIMENSIONS), dropna=False).sum().reset_index()
+    for col in DIMENSIONS:
+        if col != 'year':
+            combined[col] = combined[col].astype('category')
+    return combined
+
+
+# Label selected by default: the effective dose, which covers every exposure
+DEFAULT_LABEL = 'E (effective dose)'
+
+
+def sector_filter(selected_sector):
+    """Translate the sidebar sector choice into a `sectors` filter value."""
+    return None if selected_sector == 'All' else (selected_sector,)
+
+
+def label_filter(selected_label):
+    """Translate the sidebar label choice into a `labels` filter value.
+
+    None (a dataset without labels) keeps every row.
+    """
+    return None if selected_label is None else (selected_label,)
+
+
+def _sorted_values(values):
+    """Sort filter values, a None (missing value) last."""
+    return tuple(sorted(set(values), key=lambda value: (value is None, '' if value is None else value)))
+
+
+def _normalize(by, countries, year_range, sectors, datasets, labels):
+    """Return a hashable, order-independent key for a rollup request."""
+    by = (by,) if isinstance(by, str) else tuple(by)
+    if countries is not None:
+        countries = _sorted_values(countries)
+    if year_range is not None:
+        year_range = (int(year_range[0]), int(year_range[1]))
+    if sectors is not None:
+        sectors = _sorted_values(sectors)
+    if datasets is not None:
+        datasets = _sorted_values(datasets)
+    if labels is not None:
+        labels = _sorted_values(labels)
+    return by, countries, year_range, sectors, datasets, labels
+
+
+def _ratio(total, count):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+class AggregationEngine:
+    """Answer grouped aggregations from precomputed partials.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame, optional
+        Raw dosimetry rows the partials are built from
+    maxsize : int
+        Maximum number of memoized rollups kept (least recently used first out)
+    partials : pd.DataFrame, optional
+        Already reduced partials (see `build_partials`), used instead of `df`
+    """
+
+    def __init__(self, df=None, maxsize=256, partials=None):
+        self.partials = partials if partials is not None else build_partials(df)
+        self._init_memo(maxsize)
+
+    def _init_memo(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def rollup(self, by, countries=None, year_range=None, sectors=None, datasets=None, labels=None):
+        """Aggregate the measures by `by` for a filter selection.
+
+        Parameters:
+        -----------
+        by : str or tuple
+            Grouping column(s) among DIMENSIONS
+        countries : iterable or None
+            Countries to keep (None keeps every country)
+        year_range : tuple or None
+            Inclusive (first year, last year) (None keeps every year)
+        sectors : iterable or None
+            Sectors to keep (None keeps every row, including rows without
+            a sector; see `sector_filter`)
+        datasets : iterable or None
+            Dataset tags to keep (None keeps every dataset)
+        labels : iterable or None
+            Dose labels to keep, e.g. ('E (effective dose)',). Every
+            (country, year, sector) is reported once per label, so summing
+            over several labels counts the same workers more than once
+            (None keeps every label)
+
+        Returns:
+        --------
+        pd.DataFrame : One row per group, sorted by the grouping columns,
+            with every SUM_COLUMNS and MEAN_COLUMNS measure. The frame is
+            shared through the memo and must not be modified in place.
+        """
+        return self._memoized(_normalize(by, countries, year_range, sectors, datasets, labels))
+
+    def totals(self, countries=None, year_range=None, sectors=None, datasets=None, labels=None):
+        """Return the KPI summary of a filter selection.
+
+        Same filters as `rollup`.
+
+        Returns:
+        --------
+        dict : 'rows', 'collective_dose_total' (sum), 'collective_dose_mean'
+            (mean per row), 'average_dose_monitored' (mean),
+            'total_workers_number' (sum) and 'bands' (workers per dose band,
+            in DOSE_BANDS order)
+        """
+        return self._memoized(_normalize((), countries, year_range, sectors, datasets, labels))
+
+    def dimensions(self):
+        """Return the distinct (dataset, label, country, year, sector) combinations.
+
+        Used to build the filter options without the raw rows.
+        """
+        return self.partials[list(DIMENSIONS)]
+
+    def _memoized(self, key):
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        result = self._compute(*key)
+
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return result
+
+    def _select(self, countries, year_range, sectors, datasets, labels):
+        partials = self.partials
+        mask = np.ones(len(partials), dtype=bool)
+        if countries is not None:
+            mask &= partials['country'].isin(countries).to_numpy()
+        if year_range is not None:
+            mask &= partials['year'].between(year_range[0], year_range[1]).to_numpy(dtype=bool, na_value=False)
+        if sectors is not None:
+            mask &= partials['sector'].isin(sectors).to_numpy()
+        if datasets is not None:
+            mask &= partials['dataset'].isin(datasets).to_numpy()
+        if labels is not None:
+            mask &= partials['label'].isin(labels).to_numpy()
+        return partials.loc[mask]
+
+    @timed('aggregate.rollup')
+    def _compute(self, by, countries, year_range, sectors, datasets, labels):
+        selected = self._select(countries, year_range, sectors, datasets, labels)
+        partial_cols = [c for c in selected.columns if c not in DIMENSIONS]
+
+        if not by:
+            sums = selected[partial_cols].sum()
+            return {
+                'rows': int(sums[ROWS]),
+                'collective_dose_total': float(sums['collective_dose_total' + SUM_SUFFIX]),
+                'collective_dose_mean': float(_ratio(sums['collective_dose_total' + SUM_SUFFIX],
+                                                     sums['collective_dose_total' + COUNT_SUFFIX])),
+                'average_dose_monitored': float(_ratio(sums['average_dose_monitored' + SUM_SUFFIX],
+                                                       sums['average_dose_monitored' + COUNT_SUFFIX])),
+                'total_workers_number': float(sums['total_workers_number' + SUM_SUFFIX]),
+                'bands': sums[[band + SUM_SUFFIX for band in DOSE_BANDS]].to_numpy(dtype='float64'),
+            }
+
+        grouped = selected.groupby(list(by), observed=True)[partial_cols].sum()
+
+        result = grouped.index.to_frame(index=False)
+        for col in SUM_COLUMNS:
+            result[col] = grouped[col + SUM_SUFFIX].to_numpy()
+        for col in MEAN_COLUMNS:
+            result[col] = _ratio(grouped[col + SUM_SUFFIX].to_numpy(), grouped[col + COUNT_SUFFIX].to_numpy())
+        return result
+
+    def cache_info(self):
+        """Return memo statistics: hits, misses and current size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache), 'maxsize': self.maxsize}
@@ -0,0 +1,43 @@
+"""Runtime settings of the dashboard, read from environment variables.
+
+- DASHBOARD_DATA_DIR: folder holding the CSV exports (default: data)
+- DASHBOARD_STREAMING: set to 1 to aggregate the CSV files chunk by chunk
+  instead of loading their rows in memory
+- DASHBOARD_CHUNK_SIZE: rows per chunk in streaming mode (default: 100000)
+- DASHBOARD_BACKEND: 'pandas' (default) or 'duckdb' to run the filters and
+  aggregations as SQL on the data files (needs `pip install duckdb`)
+- DASHBOARD_PROFILE: set to 1 to time and memory-profile the pipeline
+  stages and show the debug panel in the sidebar
+- DASHBOARD_PROFILE_LOG: JSONL file each profiled call is appended to
+- DASHBOARD_PARSE_WORKERS: processes used to parse the CSV files (default:
+  1, serial; 0: one per CPU core), see utils/io.py
+- DASHBOARD_WARMUP: set to 0 to skip the background warm-up of the data
+  and common views started with the first session (default: 1)
+"""
+
+import os
+
+
+def _flag(name, default="0"):
+    return os.environ.get(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+DATA_DIR = os.environ.get("DASHBOARD_DATA_DIR", "data")
+STREAMING = _flag("DASHBOARD_STREAMING")
+CHUNK_SIZE = int(os.environ.get("DASHBOARD_CHUNK_SIZE", "100000"))
+
+# Parallel ingestion (see utils/io.py): 1 parses serially, 0 uses every core
+PARSE_WORKERS = int(os.environ.get("DASHBOARD_PARSE_WORKERS", "1")) or (os.cpu_count() or 1)
+
+# Query backend for filtering / aggregation (see utils/duck.py)
+BACKENDS = ("pandas", "duckdb")
+BACKEND = os.environ.get("DASHBOARD_BACKEND", "pandas").strip().lower()
+if BACKEND not in BACKENDS:
+    raise ValueError(f"DASHBOARD_BACKEND must be one of {', '.join(BACKENDS)}, not {BACKEND!r}")
+
+# Per-stage timing / memory instrumentation (see utils/instrument.py)
+PROFILE = _flag("DASHBOARD_PROFILE")
+PROFILE_LOG = os.environ.get("DASHBOARD_PROFILE_LOG") or None
+
+# Background warm-up at process start (see utils/warmup.py)
+WARMUP = _flag("DASHBOARD_WARMUP", "1")
@@ -0,0 +1,193 @@
+"""Canonical country registry.
+
+Every country of the exports has one entry: a stable integer ID, its
+canonical name (the one shown in the dashboard), ISO 3166-1 alpha-2 code,
+approximate centroid and the other spellings met in the exports (aliases).
+
+`resolve` maps any spelling to an ID: exact match on the normalized name
+(case, accents, punctuation and a leading "the" ignored), then a close match
+(`difflib`, FUZZY_CUTOFF) for typos. Each distinct spelling is resolved once
+per process (memoized), so a column is resolved per distinct value, not per
+row.
+
+At ingestion (`utils.io`) the country names are replaced by their canonical
+name and a 'country_id' column is added: aliases such as 'Czechia' and
+'Czech Republic' fall into the same group in every groupby, filter, in the
+dose cube and on the map. A name matching no entry keeps its spelling and
+gets an ID from UNKNOWN_BASE up, in the order such names are first met in
+the process (so these IDs are not stable between processes, unlike the
+registry ones).
+"""
+
+from collections import namedtuple
+import difflib
+from functools import lru_cache
+import re
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+Country = namedtuple('Country', ['id', 'name', 'iso', 'latitude', 'longitude', 'aliases'])
+
+COUNTRIES = (
+    Country(1, 'Austria', 'AT', 47.5162, 14.5501, ('Österreich',)),
+    Country(2, 'Belgium', 'BE', 50.5039, 4.4699, ('Belgique', 'België')),
+    Country(3, 'Bulgaria', 'BG', 42.7339, 25.4858, ()),
+    Country(4, 'Croatia', 'HR', 45.1000, 15.2000, ('Hrvatska',)),
+    Country(5, 'Czech Republic', 'CZ', 49.8175, 15.4730, ('Czechia', 'Česká republika')),
+    Country(6, 'Denmark', 'DK', 56.2639, 9.5018, ('Danmark',)),
+    Country(7, 'Estonia', 'EE', 58.5953, 25.0136, ('Eesti',)),
+    Country(8, 'Finland', 'FI', 61.9241, 25.7482, ('Suomi',)),
+    Country(9, 'France', 'FR', 46.2276, 2.2137, ()),
+    Country(10, 'Germany', 'DE', 51.1657, 10.4515, ('Deutschland', 'Allemagne')),
+    Country(11, 'Greece', 'GR', 39.0742, 21.8243, ('Hellas', 'Grèce')),
+    Country(12, 'Hungary', 'HU', 47.1625, 19.5033, ('Magyarország',)),
+    Country(13, 'Ireland', 'IE', 53.4129, -8.2439, ('Republic of Ireland', 'Éire')),
+    Country(14, 'Italy', 'IT', 41.8719, 12.5674, ('Italia', 'Italie')),
+    Country(15, 'Latvia', 'LV', 56.8796, 24.6032, ('Latvija',)),
+    Country(16, 'Lithuania', 'LT', 55.1694, 23.8813, ('Lietuva',)),
+    Country(17, 'Luxembourg', 'LU', 49.8153, 6.1296, ()),
+    Country(18, 'Norway', 'NO', 60.4720, 8.4689, ('Norge', 'Norvège')),
+    Country(19, 'Poland', 'PL', 51.9194, 19.1451, ('Polska', 'Pologne')),
+    Country(20, 'Portugal', 'PT', 39.3999, -8.2245, ()),
+    Country(21, 'Romania', 'RO', 45.9432, 24.9668, ('România', 'Roumanie')),
+    Country(22, 'Serbia', 'RS', 44.0165, 21.0059, ('Srbija',)),
+    Country(23, 'Slovakia', 'SK', 48.6690, 19.6990, ('Slovak Republic', 'Slovensko')),
+    Country(24, 'Slovenia', 'SI', 46.1512, 14.9955, ('Slovenija',)),
+    Country(25, 'Spain', 'ES', 40.4637, -3.7492, ('España', 'Espagne')),
+    Country(26, 'Sweden', 'SE', 60.1282, 18.6435, ('Sverige', 'Suède')),
+    Country(27, 'Switzerland', 'CH', 46.8182, 8.2275, ('Schweiz', 'Suisse', 'Svizzera')),
+    Country(28, 'The Netherlands', 'NL', 52.1326, 5.2913, ('Netherlands', 'Nederland', 'Holland', 'Pays-Bas')),
+)
+
+# First ID given to the names matching no registry entry
+UNKNOWN_BASE = 1000
+
+# ID of the rows without a country
+NO_COUNTRY = 0
+
+# difflib similarity from which a spelling is taken for a registry name
+# (0.9 accepts 'Lituania' but not 'Australia' for 'Austria')
+FUZZY_CUTOFF = 0.9
+
+ID_DTYPE = 'int16'
+
+_BY_ID = {country.id: country for country in COUNTRIES}
+
+
+def normalize(name):
+    """Return the matching key of a spelling: lower case, no accents or punctuation, no leading "the"."""
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = ' '.join(re.sub(r'[^\w]+', ' ', text).split())
+    return text[4:] if text.startswith('the ') else text
+
+
+def _keys():
+    """{normalized spelling: ID} of every registry name, ISO code and alias."""
+    keys = {}
+    for country in COUNTRIES:
+        for spelling in (country.name, country.iso) + country.aliases:
+            keys[normalize(spelling)] = country.id
+    return keys
+
+
+_KEYS = _keys()
+
+# Names outside the registry: normalized spelling -> ID, and ID -> first spelling met
+_unknown = {}
+_unknown_names = {}
+_unknown_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def resolve(name):
+    """Return the ID of a country spelling (NO_COUNTRY for a missing value).
+
+    Parameters:
+    -----------
+    name : str
+        Country name as written in an export, e.g. 'Czechia'
+    """
+    if name is None or (isinstance(name, float) and np.isnan(name)) or not str(name).strip():
+        return NO_COUNTRY
+    key = normalize(name)
+    country_id = _KEYS.get(key)
+    if country_id is None:
+        close = difflib.get_close_matches(key, _KEYS, n=1, cutoff=FUZZY_CUTOFF)
+        if close:
+            country_id = _KEYS[close[0]]
+    if country_id is not None:
+        return country_id
+    with _unknown_lock:
+        if key not in _unknown:
+            _unknown[key] = UNKNOWN_BASE + len(_unknown)
+            _unknown_names[_unknown[key]] = str(name).strip()
+        return _unknown[key]
+
+
+def name_of(country_id):
+    """Return the canonical name of an ID (None for NO_COUNTRY)."""
+    if country_id in _BY_ID:
+        return _BY_ID[country_id].name
+    return _unknown_names.get(country_id)
+
+
+def iso_code(country_id):
+    """Return the ISO 3166-1 alpha-2 code of an ID (None outside the registry)."""
+    country = _BY_ID.get(country_id)
+    return country.iso if country else None
+
+
+def centroid(country_id):
+    """Return the (latitude, longitude) of an ID ((None, None) outside the registry)."""
+    country = _BY_ID.get(country_id)
+    return (country.latitude, country.longitude) if country else (None, None)
+
+
+def resolve_values(values):
+    """Resolve a column of country spellings once per distinct value.
+
+    Parameters:
+    -----------
+    values : pd.Series
+        Country names (object, string or categorical)
+
+    Returns:
+    --------
+    tuple : (np.ndarray of IDs (ID_DTYPE), one per value; pd.Series of the
+        canonical names as a categorical, missing values kept missing)
+    """
+    codes, uniques = pd.factorize(values)
+    ids = np.array([resolve(value) for value in uniques] + [NO_COUNTRY], dtype=ID_DTYPE)
+    # Aliases share one category; categories sorted as by `utils.schema.apply_schema`
+    names = [name_of(i) for i in ids[:-1]]
+    categories = sorted(set(names))
+    position = {name: i for i, name in enumerate(categories)}
+    # factorize gives -1 for missing values: point them at the trailing slot
+    name_codes = np.array([position[name] for name in names] + [-1], dtype=np.int32)
+    canonical = pd.Series(pd.Categorical.from_codes(name_codes[codes], categories),
+                          index=values.index, name=values.name)
+    return ids[codes], canonical
+
+
+@lru_cache(maxsize=None)
+def _centroid_table():
+    """Latitude and longitude arrays indexed by registry ID, with a trailing NaN slot."""
+    size = max(_BY_ID) + 1
+    lat, lon = np.full(size + 1, np.nan), np.full(size + 1, np.nan)
+    for country in COUNTRIES:
+        lat[country.id], lon[country.id] = country.latitude, country.longitude
+    return lat, lon
+
+
+def centroids(ids):
+    """Return the (latitude, longitude) arrays of an array of IDs (NaN outside the registry)."""
+    lat, lon = _centroid_table()
+    ids = np.asarray(ids)
+    # IDs outside the registry (unknown names, NO_COUNTRY) read the trailing NaN slot
+    index = np.where((ids > 0) & (ids < len(lat) - 1), ids, len(lat) - 1)
+    return lat[index], lon[index]
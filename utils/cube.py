@@ -0,0 +1,321 @@
+"""Dense dose cube: the partial aggregates as NumPy arrays.
+
+The (dataset, label, country, year, sector) partials are small and nearly
+dense, so they are stored as arrays indexed by integer-coded axes: one
+array of sums and one of non-null counts per measure, plus the number of
+raw rows per cell. A rollup is then an axis selection followed by `sum`
+reductions, without any groupby.
+
+The arrays are saved as `.npy` files in `data/.cache/cube-<key>/` and
+opened with memory mapping, so every Streamlit worker process of a host
+serving the same files shares one physical copy through the page cache.
+A new set of files gets a new folder; the oldest folders beyond MAX_CUBES
+are removed when it is saved.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from utils.aggregate import (AggregationEngine, COUNT_SUFFIX, DIMENSIONS, MEAN_COLUMNS, MEASURES,
+                             ROWS, SUM_COLUMNS, SUM_SUFFIX, _ratio)
+from utils.instrument import timed
+from utils.io import PARSER_VERSION
+from utils.schema import DOSE_BANDS
+
+
+# Bump when the cube layout below changes
+CUBE_VERSION = 1
+
+# Cube folders kept on disk (least recently written first out): the older
+# ones belong to data files since replaced
+MAX_CUBES = 4
+
+_MEASURE_POS = {col: i for i, col in enumerate(MEASURES)}
+
+
+def cube_key(manifest):
+    """Return the cache key of the cube of a set of files.
+
+    Parameters:
+    -----------
+    manifest : dict
+        {path: {'hash': ...}} as returned by `DataStore.files`
+    """
+    content = sorted((os.path.abspath(path), entry['hash']) for path, entry in manifest.items())
+    payload = json.dumps([CUBE_VERSION, PARSER_VERSION, content])
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def cube_dir(data_dir, manifest):
+    """Return the folder of the cube of a set of files: `<data_dir>/.cache/cube-<key>`."""
+    return os.path.join(data_dir, '.cache', f"cube-{cube_key(manifest)}")
+
+
+class DoseCube:
+    """Partial aggregates as dense arrays.
+
+    Parameters:
+    -----------
+    axes : dict
+        {dimension: list of values}, in DIMENSIONS order. A trailing None
+        holds the rows without a value for that dimension.
+    sums, counts : np.ndarray
+        Shape (len(MEASURES), *axis lengths): per-cell sum (float64) and
+        number of non-null values (int64) of every measure
+    rows : np.ndarray
+        Shape (*axis lengths): number of raw rows per cell (0: no row)
+    """
+
+    def __init__(self, axes, sums, counts, rows):
+        self.axes = axes
+        self.sums = sums
+        self.counts = counts
+        self.rows = rows
+        self._positions = {
+            dim: {value: i for i, value in enumerate(values) if value is not None}
+            for dim, values in axes.items()
+        }
+
+    @classmethod
+    def from_partials(cls, partials):
+        """Build the cube from `utils.aggregate.build_partials` output."""
+        axes, codes = {}, []
+        for dim in DIMENSIONS:
+            column = partials[dim]
+            values = sorted(column.dropna().unique().tolist())
+            if dim == 'year':
+                values = [int(v) for v in values]
+            lookup = {value: i for i, value in enumerate(values)}
+            missing = column.isna().to_numpy()
+            if missing.any():
+                values.append(None)
+            code = np.full(len(partials), len(values) - 1, dtype=np.int64)
+            present = ~missing
+            code[present] = [lookup[int(v) if dim == 'year' else v] for v in column[present]]
+            axes[dim] = values
+            codes.append(code)
+
+        shape = tuple(len(values) for values in axes.values())
+        flat = np.ravel_multi_index(codes, shape) if len(partials) else np.empty(0, dtype=np.int64)
+
+        sums = np.zeros((len(MEASURES),) + shape, dtype='float64')
+        counts = np.zeros((len(MEASURES),) + shape, dtype='int64')
+        for i, col in enumerate(MEASURES):
+            # One partial row per cell: plain assignment
+            sums[i].flat[flat] = partials[col + SUM_SUFFIX].to_numpy(dtype='float64')
+            counts[i].flat[flat] = partials[col + COUNT_SUFFIX].to_numpy(dtype='int64')
+        rows = np.zeros(shape, dtype='int64')
+        rows.flat[flat] = partials[ROWS].to_numpy(dtype='int64')
+        return cls(axes, sums, counts, rows)
+
+    def save(self, directory):
+        """Write the arrays (.npy) and axes (JSON) to `directory`."""
+        tmp_dir = directory + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, 'sums.npy'), self.sums)
+        np.save(os.path.join(tmp_dir, 'counts.npy'), self.counts)
+        np.save(os.path.join(tmp_dir, 'rows.npy'), self.rows)
+        with open(os.path.join(tmp_dir, 'axes.json'), 'w', encoding='utf-8') as f:
+            json.dump({'dimensions': list(DIMENSIONS), 'measures': list(MEASURES), 'axes': self.axes}, f)
+        try:
+            os.replace(tmp_dir, directory)
+        except OSError:
+            # Written meanwhile by another worker process
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def open(cls, directory):
+        """Open a saved cube with memory-mapped (read-only) arrays."""
+        with open(os.path.join(directory, 'axes.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['dimensions'] != list(DIMENSIONS) or meta['measures'] != list(MEASURES):
+            raise ValueError(f"Cube in {directory} has another layout")
+        arrays = [np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+                  for name in ('sums', 'counts', 'rows')]
+        return cls(meta['axes'], *arrays)
+
+    def nbytes(self):
+        """Return the size of the arrays in bytes."""
+        return int(self.sums.nbytes + self.counts.nbytes + self.rows.nbytes)
+
+    def selection(self, countries=None, year_range=None, sectors=None, datasets=None, labels=None):
+        """Return the positions kept on every axis, in DIMENSIONS order.
+
+        Same filters as `AggregationEngine.rollup`; a None filter keeps the
+        whole axis, including its missing-value slot, and a None inside a
+        filter selects that slot.
+        """
+        wanted = {'country': countries, 'sector': sectors, 'dataset': datasets, 'label': labels}
+        index = []
+        for dim in DIMENSIONS:
+            values = self.axes[dim]
+            if dim == 'year':
+                if year_range is None:
+                    keep = np.arange(len(values))
+                else:
+                    keep = np.array([i for i, y in enumerate(values)
+                                     if y is not None and year_range[0] <= y <= year_range[1]], dtype=np.intp)
+            elif wanted[dim] is None:
+                keep = np.arange(len(values))
+            else:
+                positions = self._positions[dim]
+                keep = {positions[v] for v in wanted[dim] if v in positions}
+                # A None value selects the missing-value slot, as `isin` does
+                if None in wanted[dim] and values and values[-1] is None:
+                    keep.add(len(values) - 1)
+                keep = np.array(sorted(keep), dtype=np.intp)
+            index.append(keep)
+        return index
+
+
+def _prune(directory, keep=MAX_CUBES):
+    """Remove the oldest cube folders next to `directory`, keeping `keep` of them."""
+    folders = [path for path in glob.glob(os.path.join(os.path.dirname(directory), 'cube-*'))
+               if not path.endswith('.tmp') and path != directory]
+    # `directory` was just written: it is always kept
+    for path in sorted(folders, key=os.path.getmtime)[:max(len(folders) - keep + 1, 0)]:
+        # Removed meanwhile by another worker process, or still mapped by
+        # one (its pages stay readable until it closes them)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def open_cube(partials, directory):
+    """Return the cube saved in `directory`, building and saving it first if needed."""
+    if not os.path.exists(os.path.join(directory, 'axes.json')):
+        cube = DoseCube.from_partials(partials)
+        try:
+            os.makedirs(os.path.dirname(directory), exist_ok=True)
+            cube.save(directory)
+        except OSError:
+            # Read-only data folder: keep the in-memory cube
+            return cube
+        _prune(directory)
+    try:
+        return DoseCube.open(directory)
+    except (OSError, ValueError):
+        return DoseCube.from_partials(partials)
+
+
+def _reduce(array, index, keep_axes, offset=0):
+    """Sum `array` over the selected positions of the axes not in `keep_axes`.
+
+    Parameters:
+    -----------
+    array : np.ndarray
+        Cube array (possibly memory-mapped); its first `offset` axes are
+        kept whole, the next ones are the DIMENSIONS axes
+    index : list of np.ndarray
+        Sorted positions kept on every DIMENSIONS axis (`DoseCube.selection`)
+    keep_axes : list of int
+        DIMENSIONS axes not summed
+
+    Returns:
+    --------
+    np.ndarray : the `offset` axes, then the kept axes in DIMENSIONS order
+
+    The array is first narrowed with basic slices (a view: nothing is copied
+    out of the file) and the axes whose selection is contiguous are summed
+    in one pass over it. Only that reduced array is then gathered (`np.take`)
+    on the axes whose selection has gaps.
+    """
+    slices, gaps = [], {}
+    for axis, positions in enumerate(index):
+        if len(positions) == 0:
+            slices.append(slice(0, 0))
+            continue
+        start, stop = int(positions[0]), int(positions[-1]) + 1
+        slices.append(slice(start, stop))
+        if stop - start != len(positions):
+            gaps[axis] = positions - start
+    view = array[(slice(None),) * offset + tuple(slices)]
+
+    summed = [axis for axis in range(len(index)) if axis not in keep_axes and axis not in gaps]
+    result = view.sum(axis=tuple(axis + offset for axis in summed)) if summed else np.array(view)
+    remaining = [axis for axis in range(len(index)) if axis not in summed]
+
+    # Summed axes with gaps first: the gathered arrays only get smaller
+    for axis in sorted(gaps, key=lambda a: a in keep_axes):
+        position = remaining.index(axis) + offset
+        result = np.take(result, gaps[axis], axis=position)
+        if axis not in keep_axes:
+            result = result.sum(axis=position)
+            remaining.remove(axis)
+    return result
+
+
+class CubeEngine(AggregationEngine):
+    """Answer grouped aggregations by slicing a `DoseCube`.
+
+    Parameters:
+    -----------
+    partials : pd.DataFrame
+        Partial aggregates (see `utils.aggregate.build_partials`)
+    cache_dir : str, optional
+        Folder of the memory-mapped cube (None: keep it in memory)
+    maxsize : int
+        Maximum number of memoized rollups kept (least recently used first out)
+    """
+
+    def __init__(self, partials, cache_dir=None, maxsize=256):
+        super().__init__(partials=partials, maxsize=maxsize)
+        if cache_dir is None:
+            self.cube = DoseCube.from_partials(partials)
+        else:
+            self.cube = open_cube(partials, cache_dir)
+
+    @timed('cube.rollup')
+    def _compute(self, by, countries, year_range, sectors, datasets, labels):
+        cube = self.cube
+        index = cube.selection(countries, year_range, sectors, datasets, labels)
+        keep_axes = [DIMENSIONS.index(dim) for dim in by]
+        for axis in keep_axes:
+            # Missing values are not a group (as with pandas' groupby)
+            values = cube.axes[DIMENSIONS[axis]]
+            if values and values[-1] is None:
+                index[axis] = index[axis][index[axis] != len(values) - 1]
+
+        # Grouping axes kept in DIMENSIONS order, the others summed
+        rows = _reduce(cube.rows, index, keep_axes)
+        sums = _reduce(cube.sums, index, keep_axes, offset=1)
+        counts = _reduce(cube.counts, index, keep_axes, offset=1)
+
+        if not by:
+            total, count = sums, counts
+            dose = _MEASURE_POS['collective_dose_total']
+            monitored = _MEASURE_POS['average_dose_monitored']
+            return {
+                'rows': int(rows.sum()),
+                'collective_dose_total': float(total[dose]),
+                'collective_dose_mean': float(_ratio(total[dose], count[dose])),
+                'average_dose_monitored': float(_ratio(total[monitored], count[monitored])),
+                'total_workers_number': float(total[_MEASURE_POS['total_workers_number']]),
+                'bands': total[[_MEASURE_POS[band] for band in DOSE_BANDS]].astype('float64'),
+            }
+
+        # Put the grouping axes in the order of `by`
+        perm = [sorted(keep_axes).index(axis) for axis in keep_axes]
+        rows = rows.transpose(perm)
+        sums = sums.transpose([0] + [p + 1 for p in perm])
+        counts = counts.transpose([0] + [p + 1 for p in perm])
+
+        # Only the groups holding rows (as with observed=True)
+        present = np.nonzero(rows > 0)
+        result = pd.DataFrame({
+            dim: np.asarray(cube.axes[dim], dtype=object)[index[axis][present[i]]]
+            for i, (dim, axis) in enumerate(zip(by, keep_axes))
+        })
+        if 'year' in result.columns:
+            result['year'] = result['year'].astype('int64')
+        for col in SUM_COLUMNS:
+            result[col] = sums[_MEASURE_POS[col]][present]
+        for col in MEAN_COLUMNS:
+            pos = _MEASURE_POS[col]
+            result[col] = _ratio(sums[pos][present], counts[pos][present])
+        return result
@@ -0,0 +1,105 @@
+"""Dose-distribution analytics from the per-band worker counts.
+
+The CSV gives, for each row, the number of workers whose annual dose falls
+in each band of DOSE_BANDS (`D < RL`, `RL < D < 1 mSv`, ... `20 mSv <= D`).
+Percentiles and "workers above X mSv" are estimated from the summed bands by
+assuming doses are spread uniformly inside each band. Every function works
+on an array of band counts of shape (n_bands,) or (n_groups, n_bands), so
+many selections (e.g. one per year) are processed in one pass.
+"""
+
+import numpy as np
+
+from utils.schema import DOSE_BANDS
+
+
+# Recording level (mSv): doses below it are reported in the first band
+RECORDING_LEVEL = 0.1
+
+# Upper edge assumed for the open `20 mSv <= D` band, used for interpolation
+OPEN_BAND_UPPER = 50.0
+
+# Band edges in mSv: band i covers [BAND_EDGES[i], BAND_EDGES[i + 1])
+BAND_EDGES = np.array([0.0, RECORDING_LEVEL, 1.0, 5.0, 10.0, 15.0, 20.0, OPEN_BAND_UPPER])
+
+# Short labels for charts, in DOSE_BANDS order
+BAND_LABELS = ('< RL', 'RL - 1', '1 - 5', '5 - 10', '10 - 15', '15 - 20', '>= 20')
+
+assert len(BAND_EDGES) == len(DOSE_BANDS) + 1
+
+
+def band_matrix(frame):
+    """Return the band columns of an aggregated frame as a float64 array.
+
+    Parameters:
+    -----------
+    frame : pd.DataFrame
+        Frame holding the DOSE_BANDS columns (e.g. an engine rollup)
+
+    Returns:
+    --------
+    np.ndarray : (n_rows, n_bands) worker counts, missing values as 0
+    """
+    return np.nan_to_num(frame[list(DOSE_BANDS)].to_numpy(dtype='float64', na_value=np.nan))
+
+
+def percentiles(counts, qs=(0.5, 0.95, 0.99)):
+    """Estimate dose percentiles (mSv) from band counts.
+
+    Parameters:
+    -----------
+    counts : np.ndarray
+        (n_bands,) or (n_groups, n_bands) worker counts
+    qs : sequence of float
+        Quantiles in [0, 1]
+
+    Returns:
+    --------
+    np.ndarray : (len(qs),) or (n_groups, len(qs)) doses; NaN for groups
+        without any worker
+    """
+    counts = np.asarray(counts, dtype='float64')
+    squeeze = counts.ndim == 1
+    counts = np.atleast_2d(counts)
+    qs = np.asarray(qs, dtype='float64')
+
+    cum = np.cumsum(counts, axis=1)
+    total = cum[:, -1:]
+    targets = total * qs[None, :]                                   # (g, q)
+
+    # Band holding each target: first band whose cumulative count reaches it
+    idx = (cum[:, None, :] < targets[:, :, None]).sum(axis=2)       # (g, q)
+    idx = np.minimum(idx, counts.shape[1] - 1)
+
+    rows = np.arange(counts.shape[0])[:, None]
+    before = np.where(idx > 0, cum[rows, np.maximum(idx - 1, 0)], 0.0)
+    in_band = counts[rows, idx]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        frac = np.where(in_band > 0, (targets - before) / in_band, 0.0)
+    frac = np.clip(frac, 0.0, 1.0)
+
+    lo = BAND_EDGES[:-1][idx]
+    hi = BAND_EDGES[1:][idx]
+    result = np.where(total > 0, lo + frac * (hi - lo), np.nan)
+    return result[0] if squeeze else result
+
+
+def workers_above(counts, threshold):
+    """Estimate the number of workers whose dose exceeds `threshold` mSv.
+
+    Parameters:
+    -----------
+    counts : np.ndarray
+        (n_bands,) or (n_groups, n_bands) worker counts
+    threshold : float
+        Dose threshold in mSv
+
+    Returns:
+    --------
+    float or np.ndarray : Estimated workers above the threshold, per group
+    """
+    counts = np.asarray(counts, dtype='float64')
+    lo = BAND_EDGES[:-1]
+    hi = BAND_EDGES[1:]
+    share = np.clip((hi - threshold) / (hi - lo), 0.0, 1.0)
+    return (counts * share).sum(axis=-1)
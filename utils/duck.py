@@ -0,0 +1,292 @@
+"""DuckDB query backend (DASHBOARD_BACKEND=duckdb, see utils/config.py).
+
+Same interface as `utils.aggregate.AggregationEngine`, but every rollup is
+answered by a SQL query run by an embedded DuckDB connection directly on
+the files: the Parquet copy written by `utils.io.load_data` when it is up
+to date, the CSV otherwise. The raw rows are never loaded in pandas, the
+scans are multi-threaded and the country / year / sector filters are
+pushed down into them, so the data folder may be larger than memory.
+With the Parquet copy, a query only opens the (label, sector) partitions
+its filters can match.
+
+The cleaning done by `utils.io` is reproduced in SQL (comma decimals,
+numeric coercion, canonical country names, float32 doses summed as
+float64), so the results match the pandas path up to floating-point
+summation order.
+"""
+
+import csv
+import os
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from utils.aggregate import AggregationEngine, DIMENSIONS, MEAN_COLUMNS, MEASURES, ROWS, SUM_COLUMNS
+from utils.countries import name_of, resolve
+from utils.instrument import timed
+from utils.io import _cache_paths, _partition_matches, _read_cache_meta, _source_signature, dataset_tag, with_country_ids
+from utils.schema import COUNT_COLUMNS, DOSE_BANDS, DOSE_COLUMNS
+
+
+# Columns of the rows yielded by `DuckDBEngine.iter_rows`, in the order of
+# the frames of `utils.io.load_data` ('country_id' is added per batch)
+ROW_COLUMNS = ('country', 'year', 'sector', 'subsector', 'label') + DOSE_COLUMNS + COUNT_COLUMNS + ('dataset',)
+
+
+def _ident(name):
+    """Quote a column name ('RL  < D < 1 mSv' needs it)."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _number(expr):
+    """SQL for the numeric value of a text column, as `utils.io` parses it."""
+    return f"TRY_CAST(REPLACE(TRIM({expr}), ',', '.') AS DOUBLE)"
+
+
+def _sql_type(col):
+    """SQL type of a column in every source: numbers as DOUBLE, text as VARCHAR."""
+    return 'DOUBLE' if col == 'year' or col in MEASURES else 'VARCHAR'
+
+
+def _csv_source(path, columns=DIMENSIONS + MEASURES):
+    """SELECT returning the cleaned `columns` of one CSV export."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        header = next(csv.reader(f, delimiter=';'), [])
+    # utils.io strips the column names
+    names = {name.strip(): name for name in header}
+
+    # Same column order as every other source (they are combined by UNION ALL)
+    select = []
+    for col in columns:
+        if col == 'dataset':
+            value = _literal(dataset_tag(path))
+        elif col not in names:
+            value = f"NULL::{_sql_type(col)}"
+        elif col == 'year':
+            value = f"TRY_CAST(TRIM({_ident(names[col])}) AS DOUBLE)"
+        elif col == 'country':
+            value = _country_sql(path, names[col])
+        elif col in MEASURES:
+            value = _number(_ident(names[col]))
+            if col in DOSE_COLUMNS:
+                # Doses are stored as float32 by utils.schema
+                value = f"CAST(CAST({value} AS FLOAT) AS DOUBLE)"
+        else:
+            value = _ident(names[col])
+        select.append(f"{value} AS {_ident(col)}")
+
+    return (f"SELECT {', '.join(select)} FROM read_csv({_literal(path)}, delim=';', "
+            f"header=true, all_varchar=true)")
+
+
+def _country_sql(path, column):
+    """SQL giving the canonical country name of the raw `column` of a CSV.
+
+    The distinct spellings of the file are resolved once with the registry
+    (as `utils.io` does) and mapped with a CASE expression.
+    """
+    conn = duckdb.connect(database=':memory:')
+    try:
+        spellings = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT {_ident(column)} FROM read_csv({_literal(path)}, delim=';', "
+            f"header=true, all_varchar=true) WHERE {_ident(column)} IS NOT NULL"
+        ).fetchall()]
+    finally:
+        conn.close()
+    names = {raw: name_of(resolve(raw)) for raw in spellings}
+    # Blank names have no country (NULL), as in pandas
+    cases = ' '.join(f"WHEN {_literal(raw)} THEN {'NULL' if name is None else _literal(name)}"
+                     for raw, name in sorted(names.items()))
+    return f"CASE {_ident(column)} {cases} END" if cases else "NULL::VARCHAR"
+
+
+def _parquet_source(files, available, columns=DIMENSIONS + MEASURES):
+    """SELECT returning the `columns` of Parquet partitions written by `utils.io`.
+
+    `available` lists the columns the partitions hold.
+    """
+    select = [(f"CAST({_ident(col)} AS {_sql_type(col)})" if col in available else f"NULL::{_sql_type(col)}")
+              + f" AS {_ident(col)}" for col in columns]
+    file_list = ', '.join(_literal(f) for f in files)
+    # The folder names hold value indexes, not values: read the columns
+    return f"SELECT {', '.join(select)} FROM read_parquet([{file_list}], hive_partitioning=false)"
+
+
+def _empty_source(columns=DIMENSIONS + MEASURES):
+    """SELECT with the `columns` of a source and no row."""
+    select = [f"NULL::{_sql_type(col)} AS {_ident(col)}" for col in columns]
+    return f"SELECT {', '.join(select)} WHERE FALSE"
+
+
+class _Source:
+    """Rows of one CSV export: its up-to-date partitioned copy, or the CSV."""
+
+    def __init__(self, path):
+        self.path = path
+        meta = _read_cache_meta(path, _source_signature(path))
+        if meta is not None and meta.get('partitions'):
+            part_dir, _ = _cache_paths(path)
+            self.columns = meta['columns']
+            self.partitions = [dict(p, file=os.path.join(part_dir, p['file'])) for p in meta['partitions']]
+            self._csv = None
+        else:
+            self.partitions = None
+            self._csv = {}
+
+    def query(self, labels=None, sectors=None, columns=DIMENSIONS + MEASURES):
+        """Return the SELECT reading the `columns` of the rows that may match the filters."""
+        if self.partitions is None:
+            if columns not in self._csv:
+                self._csv[columns] = _csv_source(self.path, columns)
+            return self._csv[columns]
+        files = [p['file'] for p in self.partitions if _partition_matches(p, labels, sectors)]
+        return _parquet_source(files, self.columns, columns) if files else None
+
+
+class DuckDBEngine(AggregationEngine):
+    """Answer grouped aggregations with SQL queries on the data files.
+
+    Parameters:
+    -----------
+    paths : list of str
+        CSV exports to query (each row is tagged with `dataset_tag`)
+    maxsize : int
+        Maximum number of memoized rollups kept (least recently used first out)
+    threads : int, optional
+        DuckDB worker threads (default: one per core)
+    """
+
+    def __init__(self, paths, maxsize=256, threads=None):
+        self.paths = list(paths)
+        if not self.paths:
+            raise FileNotFoundError("No data file to query.")
+        self._sources = [_Source(path) for path in self.paths]
+        self._conn = duckdb.connect(database=':memory:')
+        if threads:
+            self._conn.execute(f"SET threads = {int(threads)}")
+        self._dimensions = None
+        self._init_memo(maxsize)
+
+    def _from(self, labels=None, sectors=None, columns=DIMENSIONS + MEASURES):
+        """FROM clause over the partitions / files the filters may match."""
+        queries = [q for q in (s.query(labels, sectors, columns) for s in self._sources) if q is not None]
+        return f"({' UNION ALL '.join(queries or [_empty_source(columns)])}) AS dosimetry"
+
+    def dimensions(self):
+        """Return the distinct (dataset, label, country, year, sector) combinations."""
+        if self._dimensions is None:
+            cols = ', '.join(DIMENSIONS)
+            self._dimensions = self._query(
+                f"SELECT DISTINCT {cols} FROM {self._from()} ORDER BY {cols} NULLS LAST", []
+            )
+        return self._dimensions
+
+    def _query(self, sql, params):
+        # One cursor per query: the engine is shared between sessions/threads
+        cursor = self._conn.cursor()
+        try:
+            return cursor.execute(sql, params).df()
+        finally:
+            cursor.close()
+
+    def iter_rows(self, countries=None, year_range=None, sectors=None, labels=None, chunk_rows=100000):
+        """Yield the rows matching a filter selection, `chunk_rows` at a time.
+
+        Same filters as `rollup`. The rows hold the columns of the pandas
+        rows (ROW_COLUMNS and 'country_id'), with the declared types of
+        `utils.schema`; they are fetched as record batches, so only one chunk
+        is in memory at a time (at least one frame is yielded, possibly empty).
+        """
+        where, params = self._where((), countries, year_range, sectors, None, labels)
+        select = []
+        for col in ROW_COLUMNS:
+            if col == 'year':
+                select.append("CAST(year AS SMALLINT) AS year")
+            elif col in DOSE_COLUMNS:
+                select.append(f"CAST({_ident(col)} AS FLOAT) AS {_ident(col)}")
+            elif col in COUNT_COLUMNS:
+                select.append(f"CAST({_ident(col)} AS UINTEGER) AS {_ident(col)}")
+            else:
+                select.append(_ident(col))
+        # Nullable integers stay integers (not float64 as by default)
+        types = {pa.int16(): pd.Int16Dtype(), pa.uint32(): pd.UInt32Dtype()}.get
+        cursor = self._conn.cursor()
+        try:
+            reader = cursor.execute(
+                f"SELECT {', '.join(select)} FROM {self._from(labels, sectors, ROW_COLUMNS)}{where}", params
+            ).fetch_record_batch(chunk_rows)
+            empty = True
+            for batch in reader:
+                empty = False
+                yield with_country_ids(batch.to_pandas(types_mapper=types))
+            if empty:
+                yield with_country_ids(reader.schema.empty_table().to_pandas(types_mapper=types))
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _where(by, countries, year_range, sectors, datasets, labels):
+        clauses, params = [], []
+        for col, values in (('country', countries), ('sector', sectors), ('dataset', datasets),
+                            ('label', labels)):
+            if values is None:
+                continue
+            if not values:
+                clauses.append('FALSE')
+                continue
+            present = [str(v) for v in values if v is not None]
+            # A None value matches the missing ones, as pandas' isin does
+            tests = [f"{col} IN ({', '.join('?' * len(present))})"] if present else []
+            if len(present) < len(values):
+                tests.append(f"{col} IS NULL")
+            clauses.append(tests[0] if len(tests) == 1 else f"({' OR '.join(tests)})")
+            params.extend(present)
+        if year_range is not None:
+            clauses.append('year BETWEEN ? AND ?')
+            params.extend(float(y) for y in year_range)
+        # Rows with a missing grouping value are dropped, as by pandas' groupby
+        clauses.extend(f"{col} IS NOT NULL" for col in by)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    @timed('duck.rollup')
+    def _compute(self, by, countries, year_range, sectors, datasets, labels):
+        where, params = self._where(by, countries, year_range, sectors, datasets, labels)
+        source = self._from(labels, sectors)
+        measures = [f"SUM({_ident(col)}) AS {_ident(col)}" for col in SUM_COLUMNS]
+        measures += [f"SUM({_ident(col)}) / COUNT({_ident(col)}) AS {_ident(col)}" for col in MEAN_COLUMNS]
+
+        if not by:
+            row = self._query(
+                f"SELECT COUNT(*) AS {ROWS}, {', '.join(measures)}, "
+                f"SUM(collective_dose_total) / COUNT(collective_dose_total) AS collective_dose_mean "
+                f"FROM {source}{where}", params
+            ).iloc[0]
+            # SUM over no row is NULL in SQL, 0 in pandas
+            total = lambda col: float(row[col]) if pd.notna(row[col]) else 0.0
+            return {
+                'rows': int(row[ROWS]),
+                'collective_dose_total': total('collective_dose_total'),
+                'collective_dose_mean': float(row['collective_dose_mean']) if pd.notna(row['collective_dose_mean']) else np.nan,
+                'average_dose_monitored': float(row['average_dose_monitored']) if pd.notna(row['average_dose_monitored']) else np.nan,
+                'total_workers_number': total('total_workers_number'),
+                'bands': np.array([total(band) for band in DOSE_BANDS], dtype='float64'),
+            }
+
+        keys = ', '.join(("CAST(year AS BIGINT) AS year" if col == 'year' else col) for col in by)
+        group = ', '.join(str(i + 1) for i in range(len(by)))
+        result = self._query(
+            f"SELECT {keys}, {', '.join(measures)} FROM {source}{where} "
+            f"GROUP BY {group} ORDER BY {group}", params
+        )
+        for col in SUM_COLUMNS:
+            # Groups whose values are all missing sum to 0, as in pandas
+            result[col] = result[col].astype('float64').fillna(0.0)
+        for col in MEAN_COLUMNS:
+            result[col] = result[col].astype('float64')
+        return result
@@ -0,0 +1,194 @@
+"""CSV / Parquet export of the filtered rows and of the derived tables.
+
+An export is produced chunk by chunk: the rows are taken `CHUNK_SIZE` at a
+time (slices of the shared dataset, or record batches of a DuckDB query),
+encoded (`iter_csv`, `iter_parquet`) and appended to a file, so neither the
+whole CSV text nor the whole Parquet buffer is ever built in memory.
+
+Files are kept in `data/.cache/exports/`, named after the content of the
+data files, the table, the filter selection and the format
+(`export_key`): an identical export asked again, by any session or worker
+process, is read from its file instead of being encoded again. The oldest
+files beyond MAX_EXPORTS are removed.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+from utils.config import CHUNK_SIZE
+from utils.instrument import timed
+from utils.io import PARSER_VERSION
+
+
+# Format -> (file extension, MIME type)
+FORMATS = {
+    'csv': ('.csv', 'text/csv'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+}
+
+# Export files kept on disk (least recently written first out)
+MAX_EXPORTS = 32
+
+
+def export_dir(data_dir):
+    """Return the export cache folder of a data folder: `<data_dir>/.cache/exports`."""
+    return os.path.join(data_dir, '.cache', 'exports')
+
+
+def export_key(manifest, name, filters, fmt):
+    """Return the cache key of an export.
+
+    Parameters:
+    -----------
+    manifest : dict
+        {path: {'hash': ...}} as returned by `DataStore.files`
+    name : str
+        Exported table, e.g. 'rows' or 'by_country'
+    filters : dict
+        Filter selection (keyword arguments of `AggregationEngine.rollup`)
+    fmt : str
+        Key of FORMATS
+    """
+    content = sorted((os.path.abspath(path), entry['hash']) for path, entry in manifest.items())
+    # The order of the selected values does not change the export
+    selection = {key: None if value is None else sorted(map(str, value)) for key, value in filters.items()}
+    payload = json.dumps([PARSER_VERSION, content, name, selection, fmt], sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def frame_chunks(frame, chunk_rows=CHUNK_SIZE):
+    """Yield `frame` in slices of `chunk_rows` rows (at least one, possibly empty)."""
+    yield frame.iloc[:chunk_rows]
+    for start in range(chunk_rows, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+def iter_csv(chunks):
+    """Encode frames as one ';' separated CSV (UTF-8), one block of bytes per frame.
+
+    The header is written with the first frame; the index is not written.
+    """
+    for i, chunk in enumerate(chunks):
+        yield chunk.to_csv(sep=';', index=False, header=i == 0).encode('utf-8')
+
+
+class _Sink:
+    """Write-only file object handing the bytes written so far to `iter_parquet`."""
+
+    def __init__(self):
+        self.closed = False
+        self._parts = []
+        self._size = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def tell(self):
+        # Absolute offsets are written in the Parquet footer
+        return self._size
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_parquet(chunks):
+    """Encode frames as one Parquet file, one row group (block of bytes) per frame.
+
+    The schema is taken from the first frame; the index is not written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _Sink()
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(sink, schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield sink.drain()
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {'csv': iter_csv, 'parquet': iter_parquet}
+
+
+def _prune(directory, keep=MAX_EXPORTS):
+    files = sorted(glob.glob(os.path.join(directory, 'export-*')), key=os.path.getmtime)
+    for path in files[:-keep]:
+        try:
+            os.remove(path)
+        except OSError:
+            # Removed meanwhile by another worker process
+            pass
+
+
+@timed()
+def export_file(chunks, key, fmt, directory):
+    """Return the path of an export file, writing it first if it is not cached.
+
+    Parameters:
+    -----------
+    chunks : callable
+        Returns the iterable of frames to export; only called when the file
+        has to be written
+    key : str
+        Cache key (see `export_key`)
+    fmt : str
+        Key of FORMATS
+    directory : str
+        Export cache folder (see `export_dir`); the system temporary folder
+        is used when it cannot be written
+
+    Returns:
+    --------
+    str : Path of the complete export file
+    """
+    extension, _ = FORMATS[fmt]
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        directory = os.path.join(tempfile.gettempdir(), 'dosimetry-exports')
+        os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"export-{key}{extension}")
+    if os.path.exists(path):
+        return path
+
+    # Written under a temporary name: a concurrent export never reads a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=extension)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for block in ENCODERS[fmt](chunks()):
+                f.write(block)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    _prune(directory)
+    return path
+
+
+def open_export(path):
+    """Return an export file opened for reading (what the download button sends).
+
+    The file object is handed to Streamlit as is: no copy of its bytes is
+    built here. It is closed once Streamlit has read it and drops it.
+    """
+    return open(path, 'rb')
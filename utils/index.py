@@ -0,0 +1,136 @@
+"""Precomputed row index used to apply the sidebar filters.
+
+Rows are grouped by (label, sector, country) once, and each group keeps its
+row offsets sorted by year. A filter then resolves to one binary search per
+selected group and a concatenation of slices, instead of a boolean scan
+over the whole frame; rows of the other labels are never touched.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.instrument import timed
+
+
+ALL_SECTORS = 'All'
+
+
+def _codes(values):
+    """Return (integer codes, code lookup) for a column; NaN gets code -1."""
+    cat = pd.Categorical(values)
+    lookup = {value: code for code, value in enumerate(cat.categories)}
+    return np.asarray(cat.codes), lookup
+
+
+class FilterIndex:
+    """Row offsets of a DataFrame grouped by (label, sector, country), sorted by year.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Frame with 'country', 'year' and 'sector' columns, and optionally
+        'label'. Rows with a missing year are never selected (as with the
+        boolean mask).
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+
+        country_codes, self._country_lookup = _codes(df['country'])
+        sector_codes, self._sector_lookup = _codes(df['sector'])
+        if 'label' in df.columns:
+            label_codes, self._label_lookup = _codes(df['label'])
+        else:
+            label_codes, self._label_lookup = np.full(len(df), -1, dtype=np.int8), {}
+        years = pd.to_numeric(df['year'], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+        valid = np.flatnonzero(~np.isnan(years))
+        # Sort by label, sector, country, then year (lexsort: last key is primary)
+        order = valid[np.lexsort((years[valid], country_codes[valid], sector_codes[valid], label_codes[valid]))]
+        l_sorted = label_codes[order]
+        s_sorted = sector_codes[order]
+        c_sorted = country_codes[order]
+
+        # Boundaries between consecutive (label, sector, country) groups
+        change = np.flatnonzero(
+            (np.diff(l_sorted) != 0) | (np.diff(s_sorted) != 0) | (np.diff(c_sorted) != 0)
+        ) + 1
+        starts = np.concatenate(([0], change))
+        ends = np.concatenate((change, [len(order)]))
+
+        # label code -> sector code -> country code -> (years, offsets)
+        self._groups = {}
+        for start, end in zip(starts, ends):
+            if start == end:
+                continue
+            sector_groups = self._groups.setdefault(int(l_sorted[start]), {}).setdefault(int(s_sorted[start]), {})
+            sector_groups[int(c_sorted[start])] = (years[order[start:end]], order[start:end])
+
+    @property
+    def countries(self):
+        """Countries of the indexed rows (missing values excluded), sorted."""
+        return list(self._country_lookup)
+
+    def positions(self, countries, year_range, sector=ALL_SECTORS, label=None):
+        """Return the sorted row offsets matching a filter selection.
+
+        Parameters:
+        -----------
+        countries : iterable
+            Selected country names
+        year_range : tuple
+            Inclusive (first year, last year)
+        sector : str
+            Selected sector, or 'All' to keep every row (including rows
+            without a sector)
+        label : str, optional
+            Selected dose label (None keeps every label)
+
+        Returns:
+        --------
+        np.ndarray : Row offsets, in the original row order
+        """
+        if label is None:
+            label_groups = list(self._groups.values())
+        else:
+            code = self._label_lookup.get(label)
+            label_groups = [self._groups[code]] if code in self._groups else []
+
+        sector_groups = []
+        for groups in label_groups:
+            if sector == ALL_SECTORS:
+                sector_groups.extend(groups.values())
+            else:
+                code = self._sector_lookup.get(sector)
+                if code in groups:
+                    sector_groups.append(groups[code])
+
+        country_codes = [self._country_lookup[c] for c in countries if c in self._country_lookup]
+        lo, hi = year_range
+
+        parts = []
+        for groups in sector_groups:
+            for code in country_codes:
+                entry = groups.get(code)
+                if entry is None:
+                    continue
+                years, offsets = entry
+                i = np.searchsorted(years, lo, side='left')
+                j = np.searchsorted(years, hi, side='right')
+                if j > i:
+                    parts.append(offsets[i:j])
+
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        result = np.concatenate(parts)
+        result.sort()
+        return result
+
+    @timed('index.select')
+    def select(self, df, countries, year_range, sector=ALL_SECTORS, label=None):
+        """Return the rows of `df` matching a filter selection.
+
+        `df` must be the frame the index was built from. The result has the
+        same rows, in the same order, as the equivalent boolean mask.
+        """
+        return df.iloc[self.positions(countries, year_range, sector, label)]
@@ -0,0 +1,158 @@
+"""Lightweight per-stage timing and memory instrumentation.
+
+Enabled with DASHBOARD_PROFILE=1 (see utils/config.py). When it is off,
+`timed` returns the decorated function unchanged and `stage` returns a
+shared no-op context manager, so the instrumented code runs as before.
+
+When it is on, every stage records its call count, wall time and peak
+traced allocation (tracemalloc; process-wide, so approximate when several
+sessions run at once), and each call is appended to DASHBOARD_PROFILE_LOG
+as a JSON line if that variable is set.
+"""
+
+from contextlib import contextmanager, nullcontext
+import functools
+import json
+import threading
+import time
+import tracemalloc
+
+from utils.config import PROFILE, PROFILE_LOG
+
+
+ENABLED = PROFILE
+
+_NULL_STAGE = nullcontext()
+_lock = threading.Lock()
+_local = threading.local()
+_stats = {}     # stage -> {'calls', 'total_s', 'max_s', 'peak_bytes'}
+_caches = {}    # cache name -> {'hits', 'misses'}
+
+if ENABLED and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def _stage(name):
+    stack = _stack()
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        # Keep the parent's peak so far before resetting the counter
+        stack[-1]['max_peak'] = max(stack[-1]['max_peak'], peak)
+    tracemalloc.reset_peak()
+    frame = {'start': current, 'max_peak': current}
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = max(frame['max_peak'], tracemalloc.get_traced_memory()[1])
+        stack.pop()
+        if stack:
+            stack[-1]['max_peak'] = max(stack[-1]['max_peak'], peak)
+        _record(name, elapsed, peak - frame['start'])
+
+
+def stage(name):
+    """Context manager timing the enclosed block as stage `name`."""
+    if not ENABLED:
+        return _NULL_STAGE
+    return _stage(name)
+
+
+def timed(name=None):
+    """Decorator recording every call of a function as a stage.
+
+    Parameters:
+    -----------
+    name : str, optional
+        Stage name (default: 'module.function')
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+        stage_name = name or f"{func.__module__.split('.')[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _stage(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _record(name, elapsed, peak_bytes):
+    with _lock:
+        entry = _stats.setdefault(name, {'calls': 0, 'total_s': 0.0, 'max_s': 0.0, 'peak_bytes': 0})
+        entry['calls'] += 1
+        entry['total_s'] += elapsed
+        entry['max_s'] = max(entry['max_s'], elapsed)
+        entry['peak_bytes'] = max(entry['peak_bytes'], peak_bytes)
+    _log({'event': 'stage', 'stage': name, 'seconds': elapsed, 'peak_bytes': peak_bytes})
+
+
+def cache_miss(name):
+    """Flag, from inside a cached function body, that `name` was computed."""
+    if ENABLED:
+        _local.missed = getattr(_local, 'missed', set()) | {name}
+
+
+@contextmanager
+def _cache_probe(name):
+    missed = getattr(_local, 'missed', set())
+    missed.discard(name)
+    _local.missed = missed
+    try:
+        yield
+    finally:
+        miss = name in _local.missed
+        _local.missed.discard(name)
+        with _lock:
+            entry = _caches.setdefault(name, {'hits': 0, 'misses': 0})
+            entry['misses' if miss else 'hits'] += 1
+        _log({'event': 'cache', 'cache': name, 'hit': not miss})
+
+
+def cache_probe(name):
+    """Context manager counting a call to the cached function `name`.
+
+    The call is a miss if the function body called `cache_miss(name)`.
+    """
+    if not ENABLED:
+        return _NULL_STAGE
+    return _cache_probe(name)
+
+
+def _log(record):
+    if PROFILE_LOG is None:
+        return
+    record = dict(record, ts=time.time(), thread=threading.current_thread().name)
+    with _lock:
+        with open(PROFILE_LOG, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+def stage_stats():
+    """Return a copy of the per-stage statistics."""
+    with _lock:
+        return {name: dict(entry) for name, entry in _stats.items()}
+
+
+def cache_stats():
+    """Return a copy of the cache hit / miss counters."""
+    with _lock:
+        return {name: dict(entry) for name, entry in _caches.items()}
+
+
+def reset():
+    """Clear every recorded statistic."""
+    with _lock:
+        _stats.clear()
+        _caches.clear()
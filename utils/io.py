@@ -1,44 +1,327 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import glob
+import hashlib
+import io
+import json
+import multiprocessing
 import os
+import shutil
 
+from utils.aggregate import build_partials, combine_partials
+from utils.config import CHUNK_SIZE, DATA_DIR, PARSE_WORKERS
+from utils.countries import resolve_values
+from utils.instrument import timed
+from utils.schema import apply_schema
 
-def load_data():
+
+# Preferred file first, then the fallback dataset
+DATA_FILES = ("corp_entier.csv", "cristallin_yeux.csv")
+DATA_PATH = os.path.join(DATA_DIR, DATA_FILES[0])
+
+# Dataset tag recorded for each row, from the source file name prefix
+DATASET_TAGS = {
+    "corp_entier": "whole_body",
+    "cristallin_yeux": "eye_lens",
+}
+
+# Bump whenever the parsing / cleaning logic below changes so that cached
+# columnar copies produced by an older parser are ignored.
+PARSER_VERSION = 5
+
+# Text dimensions never go through the "looks numeric" heuristic
+TEXT_COLUMNS = ("country", "sector", "subsector", "label")
+
+# The columnar copy is split in one Parquet file per (label, sector), so a
+# query for one label / sector reads only its files
+PARTITION_COLUMNS = ("label", "sector")
+
+# Original row number, stored in the partitions to restore the CSV order
+ROW_COLUMN = "_row"
+
+# Files at least this large are parsed by byte ranges when several workers
+# are available (see `_parse_ranges`)
+SPLIT_BYTES = 16 << 20
+
+
+def _cache_paths(path):
+    """Return the (partition folder, metadata) cache paths for a source CSV.
+
+    The cache lives in a hidden `.cache` folder next to the source file and
+    is keyed by the absolute path of the source.
     """
-    Load dosimetry data from the CSV file.
-    The file uses ';' as separator (French CSV format).
+    abs_path = os.path.abspath(path)
+    key = hashlib.sha1(abs_path.encode("utf-8")).hexdigest()[:16]
+    cache_dir = os.path.join(os.path.dirname(abs_path), ".cache")
+    stem = f"{os.path.splitext(os.path.basename(abs_path))[0]}-{key}"
+    return os.path.join(cache_dir, stem), os.path.join(cache_dir, f"{stem}.json")
+
+
+def _source_signature(path):
+    """Identify a source file version: path + size + mtime + parser version."""
+    stat = os.stat(path)
+    return {
+        "path": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "parser_version": PARSER_VERSION,
+    }
+
+
+def _read_cache_meta(path, signature):
+    """Return the cached metadata for `path` if it matches `signature`, else None."""
+    _, meta_path = _cache_paths(path)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("signature") != signature:
+        return None
+    return meta
+
+
+def _partition_matches(partition, labels, sectors):
+    return ((labels is None or partition.get("label") in labels)
+            and (sectors is None or partition.get("sector") in sectors))
+
+
+def cached_partitions(path, labels=None, sectors=None):
+    """Return the Parquet files of the up-to-date columnar copy of `path`.
+
+    Parameters:
+    -----------
+    path : str
+        Source CSV file
+    labels, sectors : iterable or None
+        Keep only the partitions of these labels / sectors (None: all;
+        None inside the iterable selects the rows without a value)
 
     Returns:
     --------
-    pd.DataFrame : DataFrame containing the raw dosimetry data
+    list or None : Paths of the matching partition files, or None when
+        there is no valid columnar copy
     """
-    path = "data/corp_entier.csv"
-    
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"File {path} does not exist. Please ensure the file is present.")
+    meta = _read_cache_meta(path, _source_signature(path))
+    if meta is None or not meta.get("partitions"):
+        return None
+    part_dir, _ = _cache_paths(path)
+    files = [os.path.join(part_dir, p["file"]) for p in meta["partitions"]
+             if _partition_matches(p, labels, sectors)]
+    if not all(os.path.exists(f) for f in files):
+        return None
+    return files
+
+
+def _compact_categories(df):
+    """Keep only the categories present, sorted: the categories `apply_schema` gives."""
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            cat = df[col].cat.remove_unused_categories()
+            df[col] = cat.cat.reorder_categories(sorted(cat.cat.categories))
+    return df
+
+
+def _read_cached_frame(path, meta, labels=None, sectors=None):
+    """Load the columnar copy of `path` and restore the recorded dtypes.
+
+    Only the partitions of `labels` / `sectors` are read (see
+    `cached_partitions`).
+    """
+    part_dir, _ = _cache_paths(path)
+    partitions = meta.get("partitions")
+    if not partitions:
+        return None
+    selected = [p for p in partitions if _partition_matches(p, labels, sectors)]
+    try:
+        import pyarrow.parquet as pq
+        # One multi-file read; the folder names are not values (no hive
+        # partitioning). No matching partition: read one for the dtypes.
+        files = [os.path.join(part_dir, p["file"]) for p in selected or partitions[:1]]
+        df = pq.read_table(files, partitioning=None).to_pandas()
+    except Exception:
+        # pyarrow missing, file absent or corrupted: fall back to the CSV
+        return None
+    if not selected:
+        df = df.iloc[:0]
+    if ROW_COLUMN not in df.columns:
+        return None
+    df = df.sort_values(ROW_COLUMN, kind="stable").drop(columns=ROW_COLUMN).reset_index(drop=True)
+    if list(df.columns) != meta["columns"]:
+        return None
+    df = _compact_categories(df)
+    for col, dtype in meta["dtypes"].items():
+        if str(df[col].dtype) != dtype:
+            try:
+                df[col] = df[col].astype(dtype)
+            except (TypeError, ValueError):
+                return None
+    return df
+
+
+def _write_partitions(part_dir, df):
+    """Write `df` as one Parquet file per (label, sector) under `part_dir`.
+
+    Files are laid out as `label=<i>/sector=<j>/data.parquet`, where i / j
+    index the sorted values ('null' for a missing value).
+
+    Returns:
+    --------
+    list of dict : One {'label', 'sector', 'file', 'rows'} entry per file
+    """
+    part_cols = [col for col in PARTITION_COLUMNS if col in df.columns]
+    codes = {col: {value: i for i, value in enumerate(sorted(df[col].dropna().unique()))}
+             for col in part_cols}
+    frame = df.assign(**{ROW_COLUMN: np.arange(len(df), dtype="int64")})
+
+    # Build the new copy next to the old one, then swap the folders
+    tmp_dir = part_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    partitions = []
+    groups = frame.groupby(part_cols, observed=True, dropna=False, sort=True) if part_cols else [((), frame)]
+    for key, group in groups:
+        key = key if isinstance(key, tuple) else (key,)
+        values = {col: (None if pd.isna(value) else value) for col, value in zip(part_cols, key)}
+        dirs = [f"{col}={'null' if values[col] is None else codes[col][values[col]]}" for col in part_cols]
+        rel = "/".join(dirs + ["data.parquet"])
+        os.makedirs(os.path.join(tmp_dir, *dirs), exist_ok=True)
+        group.to_parquet(os.path.join(tmp_dir, rel), index=False)
+        partitions.append(dict(values, file=rel, rows=len(group)))
+
+    shutil.rmtree(part_dir, ignore_errors=True)
+    os.replace(tmp_dir, part_dir)
+    return partitions
+
+
+def _write_cache(path, df, signature, numeric_cols):
+    """Persist the parsed frame (partitioned Parquet) and its dtypes (JSON).
+
+    The metadata is written even if Parquet support is unavailable, so the
+    numeric-column detection is still reused on the next run.
+    """
+    part_dir, meta_path = _cache_paths(path)
+    meta = {
+        "signature": signature,
+        "columns": list(df.columns),
+        "numeric_columns": list(numeric_cols),
+        "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "partitions": [],
+    }
+    try:
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        try:
+            meta["partitions"] = _write_partitions(part_dir, df)
+        except Exception:
+            pass
+        # Write the metadata last: it is what validates the cache entry
+        tmp_meta = meta_path + ".tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_meta, meta_path)
+    except OSError:
+        # A read-only data folder must never prevent the dashboard from loading
+        pass
+
+
+def dataset_tag(path):
+    """Return the dataset tag ('whole_body', 'eye_lens', ...) of a CSV file.
+
+    Historical versions such as `corp_entier_2019.csv` share the tag of
+    their prefix; unknown files are tagged with their file name.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    for prefix, tag in DATASET_TAGS.items():
+        if stem.startswith(prefix):
+            return tag
+    return stem
+
+
+def default_data_path(data_dir=DATA_DIR):
+    """Return the preferred CSV of `data_dir` (see DATA_FILES)."""
+    for name in DATA_FILES:
+        path = os.path.join(data_dir, name)
+        if os.path.exists(path):
+            return path
+    return os.path.join(data_dir, DATA_FILES[0])
+
+
+def list_data_files(data_dir=DATA_DIR, pattern="*.csv"):
+    """Return the sorted paths of the CSV exports found in `data_dir`."""
+    return sorted(glob.glob(os.path.join(data_dir, pattern)))
+
+
+def csv_columns(paths):
+    """Return the column names of CSV exports (header only, first file first)."""
+    columns = {}
+    for path in paths:
+        try:
+            header = pd.read_csv(path, sep=';', nrows=0).columns
+        except pd.errors.EmptyDataError:
+            continue
+        columns.update(dict.fromkeys(header.str.strip()))
+    return list(columns)
+
+
+# Values counted as numbers by the numeric-column heuristic (after _clean_text)
+NUMBER_PATTERN = r"^-?\d+(?:\.\d+)?$"
+
+
+def _is_text(dtype):
+    """True for the text dtypes read_csv gives (object, or str with pandas >= 3)."""
+    return pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+
 
-    # Read CSV using ';' as separator
-    df = pd.read_csv(path, sep=';')
+def _clean_text(values):
+    """Text of a column with comma decimals replaced, as parsed by the heuristic."""
+    return values.astype(str).str.replace(',', '.').str.strip()
 
+
+def _clean_frame(df, numeric_cols=None):
+    """Clean a freshly read CSV frame (or chunk of one).
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Frame as returned by `pd.read_csv(sep=';')`
+    numeric_cols : list or None
+        Object columns already known to be numeric. When None, they are
+        detected with the "looks numeric" heuristic.
+
+    Returns:
+    --------
+    tuple : (cleaned DataFrame, list of object columns converted to numbers)
+    """
     # Clean column names
     df.columns = df.columns.str.strip()
 
     # Convert object columns that look numeric into floats (replace ',' with '.')
     # We attempt conversion but leave the column untouched if it fails
-    obj_cols = df.select_dtypes(include=['object']).columns
-    for col in obj_cols:
-        # Skip obviously non-numeric text columns such as 'country' or 'sector'
-        if col.lower() in ("country", "sector", "subsector", "label"):
-            continue
-        cleaned = df[col].astype(str).str.replace(',', '.').str.strip()
-        # A simple heuristic: if >50% of values look numeric after cleaning, convert
-        num_like = cleaned.str.match(r"^-?\d+(?:\.\d+)?$")
-        if num_like.mean() >= 0.5:
-            try:
-                df[col] = pd.to_numeric(cleaned, errors='coerce')
-            except Exception:
-                pass
+    if numeric_cols is None:
+        numeric_cols = []
+        obj_cols = df.select_dtypes(include=['object']).columns
+        for col in obj_cols:
+            # Skip obviously non-numeric text columns such as 'country' or 'sector'
+            if col.lower() in TEXT_COLUMNS:
+                continue
+            cleaned = _clean_text(df[col])
+            # A simple heuristic: if >50% of values look numeric after cleaning, convert
+            num_like = cleaned.str.match(NUMBER_PATTERN)
+            if num_like.mean() >= 0.5:
+                try:
+                    df[col] = pd.to_numeric(cleaned, errors='coerce')
+                    numeric_cols.append(col)
+                except Exception:
+                    pass
+    else:
+        for col in numeric_cols:
+            if col in df.columns and _is_text(df[col].dtype):
+                df[col] = pd.to_numeric(_clean_text(df[col]), errors='coerce')
+
+    # Canonical country names: aliases fall into one group (see utils.countries)
+    if 'country' in df.columns:
+        df['country'] = resolve_values(df['country'])[1]
 
     # Convert 'year' column to integer
     if 'year' in df.columns:
@@ -48,4 +331,392 @@ def load_data():
         if df['year'].notna().all():
             df['year'] = df['year'].astype(int)
 
-    return df
\ No newline at end of file
+    return df, numeric_cols
+
+
+def _parse_csv(path, numeric_cols=None, workers=1):
+    """Parse and clean a dosimetry CSV.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the ';' separated CSV file
+    numeric_cols : list or None
+        Object columns already known to be numeric (see `_clean_frame`)
+    workers : int
+        Processes parsing byte ranges of a file of at least SPLIT_BYTES
+        (see `_parse_ranges`); 1 parses it in this process
+
+    Returns:
+    --------
+    tuple : (cleaned DataFrame using the declared schema (see
+             `utils.schema`), list of object columns converted to numbers)
+    """
+    df = None
+    if workers > 1 and os.path.getsize(path) >= SPLIT_BYTES:
+        df, numeric_cols = _parse_ranges(path, workers, numeric_cols)
+    if df is None:
+        # Read CSV using ';' as separator
+        df = pd.read_csv(path, sep=';')
+        df, numeric_cols = _clean_frame(df, numeric_cols)
+
+    # Record which export every row comes from
+    df['dataset'] = dataset_tag(path)
+
+    # Categorical text dimensions and downcast numeric columns
+    df = apply_schema(df)
+
+    return df, numeric_cols
+
+
+def _byte_ranges(path, n_parts):
+    """Split the data lines of a CSV into about `n_parts` byte ranges.
+
+    Returns:
+    --------
+    list of tuple : (start, end) offsets; every range starts after the
+        header and at the beginning of a line, and ends after a line break
+        (or at the end of the file)
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        bounds = [f.tell()]
+        for i in range(1, n_parts):
+            f.seek(bounds[0] + (size - bounds[0]) * i // n_parts)
+            # Move to the start of the next line
+            f.readline()
+            if bounds[-1] < f.tell() < size:
+                bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _numeric_stats(values):
+    """Return (number of values that look numeric, converted values) for one text column."""
+    cleaned = _clean_text(values)
+    return int(cleaned.str.match(NUMBER_PATTERN).sum()), pd.to_numeric(cleaned, errors='coerce')
+
+
+def _parse_range(path, start, end, names, dtype=None, detect=True):
+    """Parse one byte range of a CSV (run in a worker process).
+
+    Returns:
+    --------
+    tuple : (frame of the range, {column: `_numeric_stats`} for the text
+        columns the numeric heuristic may convert, when `detect` is True)
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(data), sep=';', header=None, names=names, dtype=dtype)
+    df.columns = df.columns.str.strip()
+    stats = {}
+    if detect:
+        for col in df.columns:
+            if col.lower() not in TEXT_COLUMNS and _is_text(df[col].dtype):
+                stats[col] = _numeric_stats(df[col])
+    return df, stats
+
+
+def _parse_ranges(path, workers, numeric_cols=None):
+    """Parse a large CSV by byte ranges in a process pool; same result as the serial parse.
+
+    Each worker tokenizes its range with `pd.read_csv` and, for the text
+    columns, counts the values that look numeric and converts them. The
+    ranges are then concatenated once, and every decision the serial parse
+    takes on a whole column is taken here on the whole column too:
+
+    - a column read as numbers in some ranges and as text in others is read
+      as text again in those ranges (the whole-file parse reads it as text);
+    - the numeric heuristic of `_clean_frame` converts a column when at
+      least half of the values of the whole column look numeric.
+
+    The ranges are split at line breaks, so the CSV must not hold quoted
+    line breaks (the dosimetry exports have none).
+
+    Returns:
+    --------
+    tuple : (cleaned frame, numeric columns) as `_clean_frame`, or
+        (None, numeric_cols) when the columns cannot be reconciled (e.g. a
+        boolean column); the caller then parses the file serially
+    """
+    names = list(pd.read_csv(path, sep=';', nrows=0).columns)
+    ranges = _byte_ranges(path, workers)
+    detect = numeric_cols is None
+    # Spawned workers, as in _map_files
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)),
+                             mp_context=multiprocessing.get_context('spawn')) as pool:
+        results = list(pool.map(_parse_range, *zip(*[(path, start, end, names, None, detect)
+                                                      for start, end in ranges])))
+    frames = [df for df, _ in results]
+    stats = [st for _, st in results]
+
+    # Columns typed differently by the ranges
+    columns = frames[0].columns
+    for col in columns:
+        dtypes = [frame[col].dtype for frame in frames]
+        if all(dtype == dtypes[0] for dtype in dtypes):
+            continue
+        if all(pd.api.types.is_integer_dtype(d) or pd.api.types.is_float_dtype(d) for d in dtypes):
+            # int64 and float64 ranges concatenate to the float64 of the serial parse
+            continue
+        text = [d for d in dtypes if _is_text(d)]
+        if not text or not all(_is_text(d) or pd.api.types.is_integer_dtype(d) or pd.api.types.is_float_dtype(d)
+                               for d in dtypes):
+            return None, numeric_cols
+        for i, (start, end) in enumerate(ranges):
+            if not _is_text(dtypes[i]):
+                raw_col = names[list(columns).index(col)]
+                frame, _ = _parse_range(path, start, end, names, dtype={raw_col: text[0]}, detect=False)
+                frames[i][col] = frame[col]
+                if detect and col.lower() not in TEXT_COLUMNS:
+                    stats[i][col] = _numeric_stats(frame[col])
+
+    df = pd.concat(frames, ignore_index=True)
+    if detect:
+        numeric_cols = []
+        for col in df.columns:
+            if col not in stats[0] or not _is_text(df[col].dtype):
+                continue
+            # Share of numeric-looking values over the whole column, as in _clean_frame
+            if len(df) and sum(st[col][0] for st in stats) / len(df) >= 0.5:
+                df[col] = pd.concat([st[col][1] for st in stats], ignore_index=True)
+                numeric_cols.append(col)
+    # Numeric columns known: converts nothing more, only coerces 'year'
+    return _clean_frame(df, numeric_cols)
+
+
+def _map_files(func, paths, workers):
+    """Return [func(path) for path in paths], run in a pool of `workers` processes.
+
+    Spawned workers: forking a process running threads (Streamlit) is unsafe.
+    """
+    if workers <= 1 or len(paths) <= 1:
+        return [func(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths)),
+                             mp_context=multiprocessing.get_context('spawn')) as pool:
+        return list(pool.map(func, paths))
+
+
+@timed()
+def load_files(paths, workers=PARSE_WORKERS):
+    """Load several CSV exports, parsing them in parallel.
+
+    Files with an up-to-date columnar copy are read in this process; the
+    others are parsed (and their copy written) by a pool of `workers`
+    processes. A single file to parse is split into byte ranges instead
+    (see `_parse_ranges`). Every frame is the same as `load_data(path)`.
+
+    Parameters:
+    -----------
+    paths : list of str
+        CSV files to load
+    workers : int
+        Worker processes (1: serial)
+
+    Returns:
+    --------
+    dict : {path: DataFrame}, in the order of `paths`
+    """
+    stale = [path for path in paths if _read_cache_meta(path, _source_signature(path)) is None]
+    frames = {}
+    if len(stale) > 1:
+        # Country IDs re-assigned here: names outside the registry get
+        # per-process IDs in the workers
+        frames.update((path, with_country_ids(frame))
+                      for path, frame in zip(stale, _map_files(load_data, stale, workers)))
+    for path in paths:
+        if path not in frames:
+            frames[path] = load_data(path, workers=workers)
+    return {path: frames[path] for path in paths}
+
+
+@timed()
+def load_data(path=None, use_cache=True, labels=None, sectors=None, workers=1):
+    """
+    Load dosimetry data from the CSV file.
+    The file uses ';' as separator (French CSV format).
+    By default `corp_entier.csv` is loaded, or `cristallin_yeux.csv` if it
+    is missing. A 'dataset' column records the source of every row.
+    Country names are replaced by their canonical name (aliases merged) and
+    a 'country_id' column holds their registry ID (see `utils.countries`).
+
+    After the first successful parse, a columnar copy (Parquet) of the cleaned
+    frame is written to `data/.cache/` together with the inferred dtypes,
+    partitioned by label and sector. Later calls read that copy back as long
+    as the source path, size, modification time and `PARSER_VERSION` are
+    unchanged, and only the partitions of the requested labels / sectors.
+
+    Parameters:
+    -----------
+    path : str, optional
+        Path of the CSV file to load (default: see `default_data_path`)
+    use_cache : bool
+        Read from / write to the on-disk columnar cache
+    labels, sectors : iterable, optional
+        Only return the rows of these labels / sectors (None inside the
+        iterable selects the rows without a value)
+    workers : int
+        Processes parsing a large file by byte ranges when it has to be
+        parsed (see `_parse_ranges`; same result as the serial parse)
+
+    Returns:
+    --------
+    pd.DataFrame : DataFrame containing the raw dosimetry data
+    """
+    if path is None:
+        path = default_data_path()
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"File {path} does not exist. Please ensure the file is present.")
+
+    if not use_cache:
+        return with_country_ids(_keep_rows(_parse_csv(path, workers=workers)[0], labels, sectors))
+
+    signature = _source_signature(path)
+    meta = _read_cache_meta(path, signature)
+    if meta is not None:
+        df = _read_cached_frame(path, meta, labels, sectors)
+        if df is not None:
+            return with_country_ids(df)
+        # Columnar copy unusable: re-parse but skip the numeric detection
+        df, numeric_cols = _parse_csv(path, numeric_cols=meta["numeric_columns"], workers=workers)
+    else:
+        df, numeric_cols = _parse_csv(path, workers=workers)
+
+    _write_cache(path, df, signature, numeric_cols)
+    return with_country_ids(_keep_rows(df, labels, sectors))
+
+
+def with_country_ids(df):
+    """Return `df` with a 'country_id' column: the registry ID of every row's country.
+
+    Added after the columnar cache is read or written (the IDs of countries
+    outside the registry are assigned per process, see `utils.countries`).
+    """
+    if 'country' not in df.columns:
+        return df
+    return df.assign(country_id=resolve_values(df['country'])[0])
+
+
+def _keep_rows(df, labels, sectors):
+    """Apply the `labels` / `sectors` selection of `load_data` to a parsed frame."""
+    mask = np.ones(len(df), dtype=bool)
+    for col, values in (("label", labels), ("sector", sectors)):
+        if values is None or col not in df.columns:
+            continue
+        values = list(values)
+        keep = df[col].isin([v for v in values if v is not None]).to_numpy()
+        if None in values:
+            keep |= df[col].isna().to_numpy()
+        mask &= keep
+    if mask.all():
+        return df
+    # Same categories as a filtered read of the columnar cache
+    return _compact_categories(df[mask].reset_index(drop=True))
+
+
+def _stream_numeric_columns(path, chunksize=CHUNK_SIZE):
+    """Return the columns `_parse_csv` converts to numbers, reading the file in chunks.
+
+    The list of the up-to-date columnar copy when there is one. Otherwise
+    the heuristic of `_clean_frame` is applied to whole columns, as by the
+    whole-file parse: a column is converted when it is read as text (some
+    value is not a number) and at least half of its values look numeric.
+    """
+    meta = _read_cache_meta(path, _source_signature(path))
+    if meta is not None:
+        return meta["numeric_columns"]
+    text, matches, rows = set(), {}, 0
+    for chunk in pd.read_csv(path, sep=';', chunksize=chunksize, dtype=str):
+        chunk.columns = chunk.columns.str.strip()
+        rows += len(chunk)
+        for col in chunk.columns:
+            if col.lower() in TEXT_COLUMNS:
+                continue
+            values = chunk[col]
+            if (values.notna() & pd.to_numeric(values, errors='coerce').isna()).any():
+                text.add(col)
+            matches[col] = matches.get(col, 0) + _numeric_stats(values)[0]
+    return [col for col in matches if col in text and matches[col] >= 0.5 * rows]
+
+
+@timed()
+def stream_file_partials(path, chunksize=CHUNK_SIZE):
+    """Aggregate one CSV export chunk by chunk (see `stream_partials`).
+
+    Parameters:
+    -----------
+    path : str
+        Path of the ';' separated CSV file
+    chunksize : int
+        Number of rows read at once
+
+    Returns:
+    --------
+    pd.DataFrame : Partials accepted by `utils.aggregate.AggregationEngine`
+        (None for a file without any row)
+    """
+    tag = dataset_tag(path)
+    partials = None
+    try:
+        numeric_cols = _stream_numeric_columns(path, chunksize)
+        chunks = pd.read_csv(path, sep=';', chunksize=chunksize)
+    except pd.errors.EmptyDataError:
+        # Empty file (not even a header)
+        return None
+    for chunk in chunks:
+        chunk, _ = _clean_frame(chunk, numeric_cols)
+        chunk['dataset'] = tag
+        # Same dtypes as the rows of `load_data` (float32 doses, ...)
+        part = build_partials(apply_schema(chunk))
+        partials = part if partials is None else combine_partials([partials, part])
+    return partials
+
+
+def stream_files(paths, chunksize=CHUNK_SIZE, workers=PARSE_WORKERS):
+    """Aggregate several CSV exports chunk by chunk, one file per worker process.
+
+    Returns:
+    --------
+    dict : {path: partials} (see `stream_file_partials`), in the order of `paths`
+    """
+    parts = _map_files(functools.partial(stream_file_partials, chunksize=chunksize), list(paths), workers)
+    return dict(zip(paths, parts))
+
+
+def stream_partials(data_dir=DATA_DIR, pattern="*.csv", chunksize=CHUNK_SIZE, workers=PARSE_WORKERS):
+    """Aggregate every CSV export of a folder without loading it in memory.
+
+    Each file is read in chunks of `chunksize` rows. Every chunk gets the
+    same cleaning as `load_data` (comma decimals, `year` coercion), is
+    tagged with its dataset (see `dataset_tag`) and folded into the running
+    (dataset, country, year, sector) partial aggregates, so only one chunk
+    of raw rows is held in memory at a time.
+
+    Parameters:
+    -----------
+    data_dir : str
+        Folder containing the CSV files
+    pattern : str
+        Glob pattern selecting the files inside `data_dir`
+    chunksize : int
+        Number of rows read at once
+    workers : int
+        Files aggregated in parallel (see `stream_files`)
+
+    Returns:
+    --------
+    pd.DataFrame : Partials accepted by `utils.aggregate.AggregationEngine`
+    """
+    paths = list_data_files(data_dir, pattern)
+    if not paths:
+        raise FileNotFoundError(f"No file matching {pattern} in {data_dir}.")
+
+    partials = None
+    for part in stream_files(paths, chunksize, workers).values():
+        if part is None:
+            continue
+        partials = part if partials is None else combine_partials([partials, part])
+
+    return partials
@@ -1,9 +1,9 @@
-import pandas as pd
-from datetime import datetime, timedelta
-import numpy as np
+from utils.aggregate import DEFAULT_LABEL, AggregationEngine, label_filter, sector_filter
+from utils.instrument import timed
 
 
-def make_tables(df_raw):
+@timed()
+def make_tables(df_raw, engine=None, label=DEFAULT_LABEL):
     """
     Prepare raw dosimetry data for visualization.
 
@@ -11,6 +11,11 @@ def make_tables(df_raw):
     -----------
     df_raw : pd.DataFrame
         Raw DataFrame containing dosimetry records
+    engine : utils.aggregate.AggregationEngine, optional
+        Aggregation engine built on `df_raw`; a new one is built if omitted
+    label : str or None
+        Dose label the tables are computed for (None: every label, which
+        counts each worker once per label)
 
     Returns:
     --------
@@ -20,50 +25,104 @@ def make_tables(df_raw):
         - 'by_sector': Aggregated doses by sector
         - 'by_country_year': Detailed country-year table
     """
-    
+    if engine is None:
+        engine = AggregationEngine(df_raw)
+    if 'label' not in df_raw.columns:
+        label = None
+    labels = label_filter(label)
+
     tables = {}
     
     # 1. Time series: collective dose aggregated by year
-    timeseries = df_raw.groupby('year').agg({
-        'collective_dose_total': 'sum',
-        'total_workers_number': 'sum',
-        'average_dose_monitored': 'mean'
-    }).reset_index()
-    timeseries = timeseries.sort_values('year')
+    timeseries = engine.rollup('year', labels=labels)[[
+        'year', 'collective_dose_total', 'total_workers_number', 'average_dose_monitored'
+    ]]
     tables['timeseries'] = timeseries
     
     # 2. Aggregation by country
-    by_country = df_raw.groupby('country').agg({
-        'collective_dose_total': 'sum',
-        'average_dose_monitored': 'mean',
-        'average_dose_exposed': 'mean',
-        'total_workers_number': 'sum'
-    }).reset_index().sort_values('collective_dose_total', ascending=False)
+    by_country = engine.rollup('country', labels=labels)[[
+        'country', 'collective_dose_total', 'average_dose_monitored', 'average_dose_exposed', 'total_workers_number'
+    ]].sort_values('collective_dose_total', ascending=False)
     tables['by_region'] = by_country  # Renommé pour correspondre à app.py
     
     # 3. Aggregation by sector
-    by_sector = df_raw[df_raw['sector'] != 'ALL MONITORED WORKERS'].groupby('sector').agg({
-        'collective_dose_total': 'sum',
-        'average_dose_monitored': 'mean',
-        'total_workers_number': 'sum'
-    }).reset_index().sort_values('collective_dose_total', ascending=False)
+    other_sectors = [s for s in df_raw['sector'].dropna().unique() if s != 'ALL MONITORED WORKERS']
+    by_sector = engine.rollup('sector', sectors=other_sectors, labels=labels)[[
+        'sector', 'collective_dose_total', 'average_dose_monitored', 'total_workers_number'
+    ]].sort_values('collective_dose_total', ascending=False)
     tables['by_sector'] = by_sector
     
     # 4. Detailed country-year table for advanced visualizations
-    by_country_year = df_raw[df_raw['sector'] == 'ALL MONITORED WORKERS'].groupby(['country', 'year']).agg({
-        'collective_dose_total': 'sum',
-        'average_dose_monitored': 'mean',
-        'total_workers_number': 'sum'
-    }).reset_index().sort_values(['country', 'year'])
+    by_country_year = engine.rollup(('country', 'year'), sectors=['ALL MONITORED WORKERS'], labels=labels)[[
+        'country', 'year', 'collective_dose_total', 'average_dose_monitored', 'total_workers_number'
+    ]]
     tables['by_country_year'] = by_country_year
     
     # 5. Geographic data: use centralised country coordinate mapping
-    from utils.geo import get_coord
+    from utils.geo import attach_coords
 
-    geo_data = df_raw[df_raw['sector'] == 'ALL MONITORED WORKERS'].copy()
-    geo_data[['latitude', 'longitude']] = geo_data['country'].apply(lambda c: pd.Series(get_coord(c)))
+    geo_rows = df_raw['sector'] == 'ALL MONITORED WORKERS'
+    if label is not None:
+        geo_rows &= df_raw['label'] == label
+    geo_data = attach_coords(df_raw[geo_rows])
     geo_data = geo_data.rename(columns={'collective_dose_total': 'value'})
     # Keep rows even if coordinates are missing; consumers (viz.map_chart)
     # will drop entries without coords when rendering the map.
     tables['geo'] = geo_data[['country', 'year', 'latitude', 'longitude', 'value', 'average_dose_monitored']]
-    return tables
\ No newline at end of file
+    return tables
+
+
+# Sector order of the sidebar; any other sector from the data is appended
+PREFERRED_SECTORS = (
+    'ALL MONITORED WORKERS', 'MEDICAL FIELD', 'INDUSTRY', 'NUCLEAR FIELD',
+    'RESEARCH AND EDUCATION', 'NATURAL SOURCES', 'TRANSPORT', 'OTHER FIELDS'
+)
+
+
+def filter_options(options):
+    """Return the choices offered by the sidebar filters.
+
+    Parameters:
+    -----------
+    options : pd.DataFrame
+        Distinct dimension values, e.g. `AggregationEngine.dimensions()`
+
+    Returns:
+    --------
+    dict : 'countries' (list), 'years' (first, last), 'sectors' ('All'
+        first, then PREFERRED_SECTORS order, then the others sorted) and
+        'labels' (DEFAULT_LABEL first; empty without a label column)
+    """
+    sectors_from_data = options['sector'].dropna().unique().tolist()
+    ordered = [s for s in PREFERRED_SECTORS if s in sectors_from_data]
+    others = [s for s in sectors_from_data if s not in PREFERRED_SECTORS]
+
+    labels_from_data = options['label'].dropna().unique().tolist() if 'label' in options.columns else []
+    labels = ([DEFAULT_LABEL] if DEFAULT_LABEL in labels_from_data else []) + \
+        sorted(label for label in labels_from_data if label != DEFAULT_LABEL)
+
+    return {
+        'countries': options['country'].unique().tolist(),
+        'years': (int(options['year'].min()), int(options['year'].max())),
+        'sectors': ['All'] + ordered + sorted(others),
+        'labels': labels,
+    }
+
+
+def default_filters(choices, sector='All'):
+    """Return the rollup filters of the sidebar defaults (every country and
+    year, first label) for one sector choice.
+
+    Parameters:
+    -----------
+    choices : dict
+        Output of `filter_options`
+    sector : str
+        Sector choice ('All' keeps every row)
+    """
+    return {
+        'countries': choices['countries'],
+        'year_range': choices['years'],
+        'sectors': sector_filter(sector),
+        'labels': label_filter(choices['labels'][0] if choices['labels'] else None),
+    }
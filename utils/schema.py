@@ -0,0 +1,106 @@
+"""Declared column schema for the dosimetry dataset.
+
+Text dimensions are stored as pandas `Categorical` (filters and groupbys then
+work on the integer category codes), dose measures as float32 and worker
+counts / dose-band histogram bins as nullable unsigned integers.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Text dimensions -> Categorical
+CATEGORY_COLUMNS = ('country', 'sector', 'subsector', 'label', 'dataset')
+
+# Dose measures (Sv / mSv) -> float32
+DOSE_COLUMNS = ('collective_dose_total', 'average_dose_monitored', 'average_dose_exposed')
+
+# Number of workers per dose band, lowest band first
+DOSE_BANDS = (
+    'D < RL',
+    'RL  < D < 1 mSv',
+    '1 mSv <= D < 5 mSv',
+    '5 mSv <= D < 10 mSv',
+    '10 mSv <= D < 15 mSv',
+    '15 mSv <= D < 20 mSv',
+    '20 mSv <= D',
+)
+
+# Worker counts -> nullable unsigned integers (the CSV has missing counts)
+COUNT_COLUMNS = ('total_workers_number',) + DOSE_BANDS
+COUNT_DTYPE = 'UInt32'
+
+
+def apply_schema(df):
+    """Return a copy of `df` converted to the declared dtypes.
+
+    Columns absent from `df` are ignored. A count column that does not hold
+    non-negative whole numbers is kept as float32 rather than truncated.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Cleaned dosimetry data as returned by the CSV parser
+
+    Returns:
+    --------
+    pd.DataFrame : DataFrame using categorical / downcast dtypes
+    """
+    df = df.copy()
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+
+    for col in DOSE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+
+    for col in COUNT_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col], errors='coerce')
+        valid = values.dropna()
+        whole = ((valid % 1 == 0) & (valid >= 0) & (valid <= np.iinfo(np.uint32).max)).all()
+        df[col] = values.astype(COUNT_DTYPE) if whole else values.astype('float32')
+
+    if 'year' in df.columns and df['year'].notna().all():
+        df['year'] = df['year'].astype('int16')
+
+    return df
+
+
+def memory_report(df):
+    """Compare the memory footprint of `df` with its untyped equivalent.
+
+    The baseline is the same frame with text dimensions as Python strings and
+    every numeric column as float64 / int64, i.e. what `pd.read_csv` produces.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        DataFrame returned by `apply_schema`
+
+    Returns:
+    --------
+    dict : 'baseline_bytes', 'schema_bytes', 'saved_bytes' and 'saved_ratio'
+    """
+    baseline = df.copy()
+    for col in baseline.columns:
+        dtype = baseline[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            baseline[col] = baseline[col].astype(object)
+        elif col == 'year':
+            baseline[col] = baseline[col].astype('int64')
+        elif pd.api.types.is_numeric_dtype(dtype):
+            baseline[col] = baseline[col].astype('float64')
+
+    baseline_bytes = int(baseline.memory_usage(deep=True).sum())
+    schema_bytes = int(df.memory_usage(deep=True).sum())
+    saved = baseline_bytes - schema_bytes
+    return {
+        'baseline_bytes': baseline_bytes,
+        'schema_bytes': schema_bytes,
+        'saved_bytes': saved,
+        'saved_ratio': saved / baseline_bytes if baseline_bytes else 0.0,
+    }
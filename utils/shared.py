@@ -0,0 +1,152 @@
+"""Process-wide, read-only dataset shared by every user session.
+
+Values returned by `st.cache_data` are pickled copies: a cached raw frame is
+copied for every session on every rerun. The dataset is instead held by one
+`SharedDataset` per process and data version (see `get_dataset` in app.py,
+a `st.cache_resource`), which every session reads without copying it.
+
+The rows are kept sorted by (label, sector, country, year) (`sort_rows`,
+applied by `utils.store.DataStore` when a file is parsed, so the dataset
+wraps the store's frame without another copy). The rows of one label and
+one sector, for every country and year, are then a single contiguous block:
+such a selection is returned as a slice (a view, no row is copied); other
+selections gather only the matching rows.
+
+`session_memory` reports what a session holds on its own (section payloads,
+widget state...), to check that it stays small next to the shared data.
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from utils.aggregate import DIMENSIONS
+from utils.index import FilterIndex
+from utils.instrument import timed
+
+
+# Sort order of the shared rows (also the grouping order of utils.index)
+ROW_ORDER = ('label', 'sector', 'country', 'year')
+
+
+def _is_sorted(frame, columns):
+    """Return True if `frame` is sorted by `columns` (missing values last)."""
+    codes, shape = [], []
+    for col in columns:
+        code, uniques = pd.factorize(frame[col], sort=True)
+        codes.append(np.where(code < 0, len(uniques), code))
+        shape.append(len(uniques) + 1)
+    key = np.ravel_multi_index(codes, shape)
+    return bool(np.all(key[1:] >= key[:-1]))
+
+
+def sort_rows(frame):
+    """Return `frame` sorted by ROW_ORDER, or `frame` itself if it already is."""
+    order = [col for col in ROW_ORDER if col in frame.columns]
+    if not order or _is_sorted(frame, order):
+        return frame
+    return frame.sort_values(order, kind='stable', ignore_index=True)
+
+
+class SharedDataset:
+    """Raw rows shared read-only between sessions.
+
+    Parameters:
+    -----------
+    frame : pd.DataFrame
+        Raw dosimetry rows (see `utils.store.DataStore.frame`); sorted with
+        `sort_rows` unless they already are
+
+    The frame is shared: callers must not modify it in
+    place (with pandas' copy-on-write, derived frames never write back).
+    """
+
+    def __init__(self, frame):
+        self.frame = sort_rows(frame)
+        self.options = self.frame.reindex(columns=list(DIMENSIONS)).drop_duplicates(ignore_index=True)
+        self._index = FilterIndex(self.frame)
+
+    @timed('shared.view')
+    def view(self, countries=None, year_range=None, sectors=None, labels=None):
+        """Return the rows matching a filter selection.
+
+        Same filters as `utils.aggregate.AggregationEngine.rollup`. A
+        selection covering a contiguous block of rows (e.g. one label and
+        one sector for every country and year) is returned as a slice of the
+        shared frame without copying it.
+
+        Returns:
+        --------
+        pd.DataFrame : Matching rows, in (label, sector, country, year) order
+        """
+        positions = self.positions(countries, year_range, sectors, labels)
+        if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+            return self.frame.iloc[positions[0]:positions[-1] + 1]
+        return self.frame.iloc[positions]
+
+    def positions(self, countries=None, year_range=None, sectors=None, labels=None):
+        """Return the sorted offsets of the rows matching a filter selection."""
+        frame = self.frame
+        if countries is None:
+            countries = self._index.countries
+        if year_range is None:
+            years = pd.to_numeric(frame['year'], errors='coerce')
+            year_range = (years.min(), years.max()) if years.notna().any() else (0, -1)
+        sector_list = ['All'] if sectors is None else list(sectors)
+        label_list = [None] if labels is None or 'label' not in frame.columns else list(labels)
+
+        parts = [self._index.positions(countries, year_range, sector, label)
+                 for label in label_list for sector in sector_list]
+        if len(parts) == 1:
+            return parts[0]
+        return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.intp)
+
+    def nbytes(self):
+        """Return the memory held by the shared rows, in bytes."""
+        return int(self.frame.memory_usage(deep=True).sum())
+
+
+def deep_size(value, _seen=None):
+    """Estimate the memory held by a value and what it references, in bytes.
+
+    Frames, series and arrays are counted with their data; containers are
+    walked recursively, and an object reached twice is counted once.
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        # A view does not own its data
+        return value.nbytes if value.base is None else 0
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_size(v, seen) for v in value)
+    return size
+
+
+def session_memory(state, shared=()):
+    """Return the memory held by one session, per session-state key.
+
+    Parameters:
+    -----------
+    state : Mapping
+        Session state (`st.session_state`)
+    shared : iterable
+        Process-wide objects (dataset, engine...) referenced from the
+        session: they are not counted
+
+    Returns:
+    --------
+    dict : {key: bytes}, largest first
+    """
+    seen = {id(obj) for obj in shared}
+    sizes = {str(key): deep_size(state[key], seen) for key in list(state.keys())}
+    return dict(sorted(sizes.items(), key=lambda item: -item[1]))
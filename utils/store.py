@@ -0,0 +1,179 @@
+"""Incrementally refreshed view of the CSV exports in the data folder.
+
+The store keeps, for every file, its parsed rows and partial aggregates
+together with a manifest entry (size, mtime and content hash). `refresh()`
+re-parses only the files that were added or changed since the last call
+(in parallel, see `utils.io.load_files`), drops removed ones, and bumps
+`version` so the dashboard caches keyed on it are rebuilt from the merged
+per-file results.
+"""
+
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+from utils.aggregate import DIMENSIONS, build_partials, combine_partials
+from utils.config import CHUNK_SIZE, DATA_DIR, PARSE_WORKERS
+from utils.io import default_data_path, list_data_files, load_files, stream_files
+from utils.schema import apply_schema
+from utils.shared import sort_rows
+
+
+def file_hash(path, block_size=1 << 20):
+    """Return the SHA-1 of a file's content."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def default_pattern(data_dir=DATA_DIR):
+    """Glob pattern of the default dataset and its yearly drops.
+
+    e.g. `corp_entier*.csv` matches `corp_entier.csv` and
+    `corp_entier_2023.csv`, but not the eye-lens exports.
+    """
+    stem = os.path.splitext(os.path.basename(default_data_path(data_dir)))[0]
+    return f"{stem}*.csv"
+
+
+class DataStore:
+    """Parsed CSV exports of a folder, refreshed file by file.
+
+    Parameters:
+    -----------
+    data_dir : str
+        Folder containing the CSV files
+    pattern : str, optional
+        Glob pattern of the files to load (default: see `default_pattern`)
+    streaming : bool
+        Keep only the partial aggregates of each file (read in chunks, see
+        `utils.io.stream_file_partials`) instead of its rows
+    parse : bool
+        Parse the files. When False the store only tracks which files
+        changed, for engines that read the files themselves (see
+        `utils.duck`)
+    workers : int, optional
+        Processes parsing the changed files (default: PARSE_WORKERS). The
+        rows are the same as with a serial parse.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, pattern=None, streaming=False, chunksize=CHUNK_SIZE, parse=True,
+                 workers=None):
+        self.data_dir = data_dir
+        self.pattern = pattern or default_pattern(data_dir)
+        self.streaming = streaming
+        self.chunksize = chunksize
+        self.parse = parse
+        self.workers = PARSE_WORKERS if workers is None else workers
+        self.version = 0
+        self._manifest = {}   # path -> {'size', 'mtime_ns', 'hash'}
+        self._frames = {}     # path -> parsed rows (row mode only)
+        self._partials = {}   # path -> partial aggregates
+        self._frame = None
+        self._merged_partials = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Load added / changed files and forget removed ones.
+
+        Files whose size and mtime are unchanged are skipped without being
+        read; files whose mtime changed but whose content hash did not are
+        not re-parsed either.
+
+        Returns:
+        --------
+        int : Current data version (incremented when anything changed)
+        """
+        with self._lock:
+            paths = list_data_files(self.data_dir, self.pattern)
+            changed = False
+
+            for path in set(self._manifest) - set(paths):
+                self._forget(path)
+                changed = True
+
+            updated = {}
+            for path in paths:
+                stat = os.stat(path)
+                entry = self._manifest.get(path)
+                if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                    continue
+                digest = file_hash(path)
+                if entry and entry['hash'] == digest:
+                    entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                    continue
+                updated[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest}
+
+            if updated:
+                # All the changed files at once: parsed in parallel (see `workers`)
+                self._load(list(updated))
+                self._manifest.update(updated)
+                changed = True
+
+            if changed or self.version == 0:
+                if not self._manifest and self.version == 0:
+                    raise FileNotFoundError(f"No file matching {self.pattern} in {self.data_dir}.")
+                self._merge()
+                self.version += 1
+            return self.version
+
+    def frame(self):
+        """Return the rows of every loaded file (row mode only).
+
+        Rows are sorted by (label, sector, country, year), see `utils.shared.sort_rows`.
+        """
+        if self.streaming:
+            raise ValueError("DataStore in streaming mode keeps no raw rows")
+        return self._frame
+
+    def partials(self):
+        """Return the partial aggregates of every loaded file."""
+        return self._merged_partials
+
+    def files(self):
+        """Return the manifest: {path: {'size', 'mtime_ns', 'hash'}}."""
+        return {path: dict(entry) for path, entry in self._manifest.items()}
+
+    def _load(self, paths):
+        if not self.parse:
+            return
+        if self.streaming:
+            self._partials.update(stream_files(paths, self.chunksize, self.workers))
+        else:
+            for path, frame in load_files(paths, self.workers).items():
+                # Rows kept in the order of utils.shared: the shared dataset wraps them as is
+                frame = sort_rows(frame)
+                self._frames[path] = frame
+                self._partials[path] = build_partials(frame)
+
+    def _forget(self, path):
+        self._manifest.pop(path, None)
+        self._frames.pop(path, None)
+        self._partials.pop(path, None)
+
+    def _merge(self):
+        if not self.parse:
+            return
+        # Per-file results are merged in path order so the row order is stable
+        paths = sorted(self._partials)
+        parts = [self._partials[p] for p in paths if self._partials[p] is not None]
+        if not parts:
+            # Empty files only, or every file removed since the last refresh:
+            # no row, same columns as `build_partials`
+            self._merged_partials = build_partials(pd.DataFrame(columns=list(DIMENSIONS)))
+        else:
+            self._merged_partials = parts[0] if len(parts) == 1 else combine_partials(parts)
+        if not self.streaming:
+            frames = [self._frames[p] for p in paths]
+            if not frames:
+                # Every file removed: no row, the columns of the last rows
+                self._frame = self._frame.iloc[:0]
+            elif len(frames) == 1:
+                self._frame = frames[0]
+            else:
+                # Categories differ between files: re-apply the schema once
+                self._frame = sort_rows(apply_schema(pd.concat(frames, ignore_index=True)))
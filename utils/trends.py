@@ -0,0 +1,218 @@
+"""Trend and anomaly analytics over the country x year matrix.
+
+A long (country, year, value) table, such as the `by_country_year` table of
+`utils.prep.make_tables` or an engine rollup by ('country', 'year'), is
+pivoted once into a dense 2-D array with one row per country and one column
+per year (NaN where a country has no value for a year). Year-over-year
+deltas, rolling means, least-squares slopes and z-scores are then computed
+for every country at once with array operations, without any per-country
+loop, so hundreds of countries/regions over decades of years take a few
+milliseconds.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# |z| from which a country level is reported as an outlier
+OUTLIER_Z = 1.5
+
+# Yearly change, relative to the mean level, below which a trend is reported as stable
+STABLE_CHANGE = 0.01
+
+
+def country_year_matrix(table, value, row='country', col='year'):
+    """Pivot a long table into a dense (rows x years) array.
+
+    Parameters:
+    -----------
+    table : pd.DataFrame
+        One row per (row, col) pair, e.g. `engine.rollup(('country', 'year'))`
+    value : str
+        Column holding the values
+    row, col : str
+        Columns giving the matrix rows and columns; with `row=None` the
+        table is a single series (e.g. a rollup by year) and the matrix
+        has one row, labelled None
+
+    Returns:
+    --------
+    tuple : (row labels, sorted years as int64, (n_rows, n_years) float64
+        array with NaN for the missing pairs)
+    """
+    if row is None:
+        row_codes, rows = np.zeros(len(table), dtype=np.intp), [None]
+    else:
+        row_codes, rows = pd.factorize(table[row], sort=True)
+    col_codes, cols = pd.factorize(table[col], sort=True)
+    matrix = np.full((len(rows), len(cols)), np.nan)
+    matrix[row_codes, col_codes] = table[value].to_numpy(dtype='float64', na_value=np.nan)
+    return np.asarray(rows, dtype=object), np.asarray(cols, dtype='int64'), matrix
+
+
+def yoy_deltas(matrix):
+    """Year-over-year change of every row.
+
+    Returns:
+    --------
+    np.ndarray : (n_rows, n_years - 1) array; column j is the change from
+        year j to year j + 1 (NaN if either value is missing)
+    """
+    return np.diff(np.asarray(matrix, dtype='float64'), axis=1)
+
+
+def rolling_mean(matrix, window=3):
+    """Trailing mean over `window` years, ignoring missing values.
+
+    Returns:
+    --------
+    np.ndarray : Same shape as `matrix`; NaN where the window holds no value
+    """
+    matrix = np.asarray(matrix, dtype='float64')
+    valid = ~np.isnan(matrix)
+    # Cumulative sums with a leading zero column: window sum = csum[j+1] - csum[j+1-w]
+    pad = np.zeros((matrix.shape[0], 1))
+    csum = np.concatenate((pad, np.cumsum(np.where(valid, matrix, 0.0), axis=1)), axis=1)
+    ccount = np.concatenate((pad, np.cumsum(valid, axis=1)), axis=1)
+    end = np.arange(1, matrix.shape[1] + 1)
+    start = np.maximum(end - window, 0)
+    sums = csum[:, end] - csum[:, start]
+    counts = ccount[:, end] - ccount[:, start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def trend_slopes(matrix, years):
+    """Least-squares slope of every row against the years, ignoring missing values.
+
+    Parameters:
+    -----------
+    matrix : np.ndarray
+        (n_rows, n_years) values
+    years : np.ndarray
+        (n_years,) year of each column
+
+    Returns:
+    --------
+    np.ndarray : (n_rows,) change per year; NaN for rows with fewer than two
+        years of data
+    """
+    matrix = np.asarray(matrix, dtype='float64')
+    valid = ~np.isnan(matrix)
+    # Centre the years for a better-conditioned closed form
+    x = np.asarray(years, dtype='float64')
+    if len(x):
+        x = x - x.mean()
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, matrix, 0.0)
+    n = valid.sum(axis=1)
+    sx, sy = x.sum(axis=1), y.sum(axis=1)
+    sxx, sxy = (x * x).sum(axis=1), (x * y).sum(axis=1)
+    denom = n * sxx - sx * sx
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where((n >= 2) & (denom > 0), (n * sxy - sx * sy) / denom, np.nan)
+
+
+def row_means(matrix):
+    """Mean of every row over its available years (NaN for an empty row)."""
+    matrix = np.asarray(matrix, dtype='float64')
+    valid = ~np.isnan(matrix)
+    counts = valid.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, np.where(valid, matrix, 0.0).sum(axis=1) / np.maximum(counts, 1), np.nan)
+
+
+def zscores(values):
+    """Standard scores of a 1-D array, ignoring missing values.
+
+    Returns:
+    --------
+    np.ndarray : (values - mean) / std; 0 when every value is equal, NaN for
+        the missing values
+    """
+    values = np.asarray(values, dtype='float64')
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return np.full(values.shape, np.nan)
+    mean = values[valid].mean()
+    std = values[valid].std()
+    if std == 0:
+        return np.where(valid, 0.0, np.nan)
+    return (values - mean) / std
+
+
+def analyze(table, value, row='country', window=3):
+    """Compute every trend and anomaly statistic of a long table.
+
+    Parameters:
+    -----------
+    table : pd.DataFrame
+        One row per (country, year), e.g. `engine.rollup(('country', 'year'))`
+    value : str
+        Measure analyzed, e.g. 'average_dose_monitored'
+    row : str or None
+        Column giving the matrix rows (None: `table` is one series by year)
+    window : int
+        Years averaged by the rolling mean
+
+    Returns:
+    --------
+    dict : 'countries', 'years', 'matrix' (countries x years), 'deltas'
+        (year-over-year), 'rolling', 'slopes' (per year), 'change' (slope
+        relative to the mean level, i.e. the fraction of the level gained
+        or lost per year), 'level' (mean over the years) and 'zscores' (of
+        the levels across countries)
+    """
+    countries, years, matrix = country_year_matrix(table, value, row)
+    slopes = trend_slopes(matrix, years)
+    level = row_means(matrix)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = np.where(level != 0, slopes / np.abs(level), np.nan)
+    return {
+        'countries': countries,
+        'years': years,
+        'matrix': matrix,
+        'deltas': yoy_deltas(matrix),
+        'rolling': rolling_mean(matrix, window),
+        'slopes': slopes,
+        'change': change,
+        'level': level,
+        'zscores': zscores(level),
+    }
+
+
+def trend_direction(change, stable=STABLE_CHANGE):
+    """Classify relative changes as 'increase', 'decrease' or 'stable' (None if unknown)."""
+    change = np.asarray(change, dtype='float64')
+    direction = np.where(change > stable, 'increase', np.where(change < -stable, 'decrease', 'stable'))
+    return np.where(np.isnan(change), None, direction)
+
+
+def outliers(stats, threshold=OUTLIER_Z, high=True):
+    """Return the (country, z-score) pairs beyond `threshold`, most extreme first.
+
+    Parameters:
+    -----------
+    stats : dict
+        Output of `analyze`
+    threshold : float
+        Minimum |z| reported
+    high : bool
+        True for the levels above the mean, False for those below
+    """
+    z = stats['zscores']
+    signed = z if high else -z
+    keep = np.flatnonzero(np.nan_to_num(signed, nan=-np.inf) >= threshold)
+    keep = keep[np.argsort(-signed[keep], kind='stable')]
+    return [(stats['countries'][i], float(z[i])) for i in keep]
+
+
+def rising_years(stats, row=0, top=3):
+    """Return the years where a row increased most, as (year, delta) pairs.
+
+    Only increases are returned, largest first.
+    """
+    deltas = stats['deltas'][row]
+    keep = np.flatnonzero(np.nan_to_num(deltas, nan=0.0) > 0)
+    keep = keep[np.argsort(-deltas[keep], kind='stable')][:top]
+    return [(int(stats['years'][i + 1]), float(deltas[i])) for i in keep]
@@ -0,0 +1,93 @@
+"""Independently re-runnable dashboard sections ("units").
+
+A unit is a section render function wrapped with `section_unit`:
+
+- it runs as a Streamlit fragment, so a widget placed inside the section
+  (e.g. the map-only year picker) reruns that section alone instead of the
+  whole script;
+- it declares the context inputs it depends on (`depends_on`) and only
+  receives those;
+- its optional `compute` step is memoized per session on the data version
+  and the declared inputs, so a rerun that changes an unrelated filter
+  renders the section from its previous result without recomputing it.
+
+Units are called with the context dict built by app.py, which holds at
+least 'data_version' plus every input a unit may declare.
+"""
+
+import numpy as np
+import streamlit as st
+
+from utils.instrument import stage
+
+
+_PAYLOADS_KEY = "_unit_payloads"
+_STATS_KEY = "_unit_stats"
+
+
+def _freeze(value):
+    """Return a hashable, comparable version of a context input."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, np.ndarray):
+        return tuple(value.tolist())
+    if isinstance(value, (str, int, float, bool, type(None), np.generic)):
+        return value
+    # Shared objects (engine, ...) are compared by identity
+    return ('id', id(value))
+
+
+def section_unit(depends_on=(), compute=None):
+    """Turn a section render function into an independently re-runnable unit.
+
+    Parameters:
+    -----------
+    depends_on : tuple of str
+        Context keys the section reads; they are passed to `compute` and to
+        the render function as keyword arguments
+    compute : callable, optional
+        `compute(**inputs)` returning the data the section displays. Its
+        result is reused while the data version and inputs are unchanged.
+
+    The decorated function is called as `render(payload, **inputs)`, where
+    `payload` is the result of `compute` (None without `compute`).
+    """
+    def decorator(render):
+        name = f"{render.__module__}.{render.__name__}"
+
+        @st.fragment
+        def unit(context):
+            inputs = {key: context[key] for key in depends_on}
+            stats = st.session_state.setdefault(_STATS_KEY, {}).setdefault(
+                name, {'runs': 0, 'computes': 0}
+            )
+            stats['runs'] += 1
+
+            payload = None
+            if compute is not None:
+                key = (context.get('data_version'), _freeze(inputs))
+                payloads = st.session_state.setdefault(_PAYLOADS_KEY, {})
+                cached = payloads.get(name)
+                if cached is not None and cached[0] == key:
+                    payload = cached[1]
+                else:
+                    with stage(f"unit.{render.__name__}.compute"):
+                        payload = compute(**inputs)
+                    payloads[name] = (key, payload)
+                    stats['computes'] += 1
+
+            with stage(f"unit.{render.__name__}"):
+                render(payload, **inputs)
+
+        unit.__name__ = render.__name__
+        unit.__doc__ = render.__doc__
+        unit.depends_on = tuple(depends_on)
+        return unit
+    return decorator
+
+
+def unit_stats():
+    """Return {unit name: {'runs', 'computes'}} for the current session."""
+    return {name: dict(stats) for name, stats in st.session_state.get(_STATS_KEY, {}).items()}
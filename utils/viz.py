@@ -1,13 +1,13 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import altair as alt
-import plotly.graph_objects as go
-import plotly.express as px
 
-from utils.geo import get_coord
+from utils.geo import attach_coords, unknown_countries
+from utils.dist import BAND_LABELS, percentiles, workers_above
+from utils.instrument import stage, timed
 
 
+@timed()
 def line_chart(data):
     """Create a line chart showing the evolution of collective dose over time.
 
@@ -20,17 +20,10 @@ def line_chart(data):
         st.warning("No data available for the line chart")
         return
     
-    # Créer un graphique avec Altair
-    chart = alt.Chart(data).mark_line(point=True, size=3).encode(
-    x=alt.X('year:O', title='Year', axis=alt.Axis(format='d')),
-    y=alt.Y('collective_dose_total:Q', title='Total collective dose (Sv)'),
-        tooltip=['year:O', 'collective_dose_total:Q', 'average_dose_monitored:Q']
-    ).properties(
-        width=800,
-        height=400
-    ).interactive()
+    chart = line_chart_spec(data)
     
-    st.altair_chart(chart, use_container_width=True)
+    with stage('viz.altair_serialize'):
+        st.altair_chart(chart, use_container_width=True)
     
     # Afficher les statistiques
     col1, col2 = st.columns(2)
@@ -40,6 +33,24 @@ def line_chart(data):
         st.metric("Mean monitored dose", f"{data['average_dose_monitored'].mean():.3f} Sv")
 
 
+@timed()
+def line_chart_spec(data):
+    """Build the Altair chart drawn by `line_chart` (without rendering it)."""
+    # Import différé : altair n'est chargé qu'au premier graphique
+    import altair as alt
+
+    # Créer un graphique avec Altair
+    return alt.Chart(data).mark_line(point=True, size=3).encode(
+    x=alt.X('year:O', title='Year', axis=alt.Axis(format='d')),
+    y=alt.Y('collective_dose_total:Q', title='Total collective dose (Sv)'),
+        tooltip=['year:O', 'collective_dose_total:Q', 'average_dose_monitored:Q']
+    ).properties(
+        width=800,
+        height=400
+    ).interactive()
+
+
+@timed()
 def bar_chart(data):
     """Create a bar chart to compare countries.
 
@@ -52,13 +63,33 @@ def bar_chart(data):
         st.warning("No data available for the bar chart")
         return
     
-    # Renommer 'country' en 'region' pour cohérence
+    # Renommer 'country' en 'region' pour cohérence (new frame, data not copied)
     if 'country' in data.columns:
-        data = data.copy()
         data = data.rename(columns={'country': 'region'})
     
+    chart = bar_chart_spec(data)
+    
+    with stage('viz.altair_serialize'):
+        st.altair_chart(chart, use_container_width=True)
+    
+    # Afficher un tableau détaillé
+    st.subheader("Details by country")
+    display_data = data[['region', 'collective_dose_total', 'average_dose_monitored', 'total_workers_number']].set_axis(
+        ['Country', 'Collective Dose (Sv)', 'Mean monitored dose (Sv)', 'Workers'], axis=1
+    )
+    st.dataframe(display_data, use_container_width=True)
+
+
+@timed()
+def bar_chart_spec(data):
+    """Build the Altair chart drawn by `bar_chart` (without rendering it).
+
+    `data` must already use the 'region' column name.
+    """
+    import altair as alt
+
     # Créer un graphique avec Altair
-    chart = alt.Chart(data).mark_bar(color='steelblue').encode(
+    return alt.Chart(data).mark_bar(color='steelblue').encode(
         x=alt.X('region:N', title='Country'),
         y=alt.Y('average_dose_monitored:Q', title='Average monitored dose (Sv)'),
         tooltip=[
@@ -71,93 +102,229 @@ def bar_chart(data):
         width=800,
         height=400
     ).interactive()
-    
-    st.altair_chart(chart, use_container_width=True)
-    
-    # Afficher un tableau détaillé
-    st.subheader("Details by country")
-    display_data = data[['region', 'collective_dose_total', 'average_dose_monitored', 'total_workers_number']].copy()
-    display_data.columns = ['Country', 'Collective Dose (Sv)', 'Mean monitored dose (Sv)', 'Workers']
-    st.dataframe(display_data, use_container_width=True)
 
 
+@timed()
+def distribution_chart(counts, threshold, by_year=None):
+    """Create a bar chart of the workers per dose band with percentile KPIs.
+
+    Parameters:
+    -----------
+    counts : np.ndarray
+        Workers per dose band, in `utils.schema.DOSE_BANDS` order
+    threshold : float
+        Dose (mSv) used for the "workers above" indicator
+    by_year : pd.DataFrame, optional
+        Columns 'year', 'p50', 'p95', 'p99' (estimated percentiles per year)
+    """
+    total = float(np.sum(counts))
+    if total == 0:
+        st.warning("No dose-band data available for the distribution")
+        return
+
+    data = pd.DataFrame({
+        'band': list(BAND_LABELS),
+        'workers': np.asarray(counts, dtype='float64'),
+    })
+    data['share'] = data['workers'] / total
+
+    import altair as alt
+    chart = alt.Chart(data).mark_bar(color='darkorange').encode(
+        x=alt.X('band:N', title='Annual dose band (mSv)', sort=list(BAND_LABELS)),
+        y=alt.Y('workers:Q', title='Workers', scale=alt.Scale(type='symlog')),
+        tooltip=[
+            alt.Tooltip('band:N', title='Band (mSv)'),
+            alt.Tooltip('workers:Q', format=',.0f', title='Workers'),
+            alt.Tooltip('share:Q', format='.2%', title='Share'),
+        ]
+    ).properties(
+        width=800,
+        height=350
+    )
+
+    with stage('viz.altair_serialize'):
+        st.altair_chart(chart, use_container_width=True)
+
+    p50, p95, p99 = percentiles(counts)
+    above = workers_above(counts, threshold)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Median dose (est.)", f"{p50:.2f} mSv")
+    with col2:
+        st.metric("95th percentile (est.)", f"{p95:.2f} mSv")
+    with col3:
+        st.metric("99th percentile (est.)", f"{p99:.2f} mSv")
+    with col4:
+        st.metric(f"Workers above {threshold:g} mSv (est.)", f"{above:,.0f}",
+                  help=f"{above / total:.3%} of the workers with a dose-band record")
+
+    if by_year is not None and not by_year.empty:
+        st.subheader("Estimated percentiles by year")
+        display_data = by_year.set_axis(['Year', 'Median (mSv)', 'P95 (mSv)', 'P99 (mSv)'], axis=1)
+        st.dataframe(display_data.round(3), use_container_width=True, hide_index=True)
+
+
+@timed()
 def map_chart(data):
     """Create an interactive map for geographic data.
 
     Parameters:
     -----------
     data : pd.DataFrame
-        DataFrame with columns 'country', 'year', 'collective_dose_total', 'average_dose_monitored'
+        Per-country aggregates with columns 'country', 'collective_dose_total',
+        'average_dose_monitored', 'total_workers_number' (one row per country,
+        see `utils.aggregate.AggregationEngine.rollup`)
     """
     if data.empty:
         st.warning("No data available for the map")
         return
     
-    # Prepare coordinates using centralised mapping (utils.geo.get_coord)
-    map_data = data.copy()
-    map_data[['latitude', 'longitude']] = map_data['country'].apply(
-        lambda c: pd.Series(get_coord(c))
-    )
-    
-    # Aggregate by country to avoid duplicates
-    map_agg = map_data.groupby(['country', 'latitude', 'longitude']).agg({
-        'collective_dose_total': 'sum',
-        'average_dose_monitored': 'mean',
-        'total_workers_number': 'sum'
-    }).reset_index()
-
-    map_agg['collective_dose_total'] = map_agg['collective_dose_total'].round(3)
-    map_agg['average_dose_monitored'] = map_agg['average_dose_monitored'].round(3)
-
-    # Drop rows without valid coordinates (we can't map them)
-    map_agg = map_agg.dropna(subset=['latitude', 'longitude'])
+    map_agg, missing = prepare_map_data(data)
+    if missing:
+        st.caption(f"Not shown on the map (no coordinates): {', '.join(missing)}")
     if map_agg.empty:
         st.warning("No valid coordinates for the selected countries")
         return
     
     # --- Utiliser pydeck (deck.gl) pour une carte intégrée à Streamlit ---
     try:
-        import pydeck as pdk
+        import pydeck  # noqa: F401 (the Deck is built by `map_deck`)
     except Exception:
         st.warning("pydeck is not available. Install pydeck to display the advanced map.")
         return
 
-    # Préparer un code couleur RGB selon la dose moyenne (normalisation simple)
-    min_avg = map_agg['average_dose_monitored'].min()
-    max_avg = map_agg['average_dose_monitored'].max()
+    # Couleurs, rayons et centre calculés une seule fois par jeu de données agrégé
+    deck = map_deck(*_cached_map_layer_payload(map_agg))
+
+    with stage('viz.pydeck_serialize'):
+        st.pydeck_chart(deck)
+
+    # Display country statistics table
+    st.subheader(":bar_chart: Country statistics")
+    stats = map_agg[['country', 'collective_dose_total', 'average_dose_monitored', 'total_workers_number']].set_axis(
+        ['Country', 'Collective Dose (Sv)', 'Mean monitored dose (Sv)', 'Workers'], axis=1
+    )
+    st.dataframe(stats.sort_values('Collective Dose (Sv)', ascending=False), use_container_width=True)
+
+
+@timed()
+def prepare_map_data(data):
+    """Attach coordinates to per-country aggregates for `map_chart`.
+
+    Returns:
+    --------
+    tuple : (frame of the countries with coordinates, sorted list of the
+             countries without coordinates)
+    """
+    # Prepare coordinates using centralised mapping (one lookup per country)
+    map_agg = attach_coords(
+        data[['country', 'collective_dose_total', 'average_dose_monitored', 'total_workers_number']]
+    )
+
+    map_agg['collective_dose_total'] = map_agg['collective_dose_total'].round(3)
+    map_agg['average_dose_monitored'] = map_agg['average_dose_monitored'].round(3).fillna(0)
+
+    # Drop rows without valid coordinates (we can't map them)
+    missing = unknown_countries(map_agg.loc[map_agg['latitude'].isna(), 'country'])
+    map_agg = map_agg.dropna(subset=['latitude', 'longitude'])
+    return map_agg, missing
+
+
+def _dose_colors(avg):
+    """Map average doses to RGBA colours (blue -> orange gradient).
+
+    Parameters:
+    -----------
+    avg : np.ndarray
+        Average monitored doses
+
+    Returns:
+    --------
+    np.ndarray : (n, 4) uint8 array of RGBA colours
+    """
+    min_avg = avg.min()
+    max_avg = avg.max()
     range_avg = max_avg - min_avg if max_avg != min_avg else 1.0
-    
-    def avg_to_color(v):
-        # Normaliser v entre 0 et 1
-        norm = (v - min_avg) / range_avg
-        # Gradient bleu -> orange
-        r = int(255 * norm)
-        g = int(120 * (1 - norm) + 60 * norm)
-        b = int(200 * (1 - norm))
-        return [r, g, b, 180]
-    
-    map_agg['average_dose_monitored'] = map_agg['average_dose_monitored'].fillna(0)
-    map_agg['color'] = map_agg['average_dose_monitored'].apply(lambda x: avg_to_color(x))
+    # Normaliser entre 0 et 1
+    norm = np.clip((avg - min_avg) / range_avg, 0.0, 1.0)
+
+    colors = np.empty((len(avg), 4), dtype=np.uint8)
+    colors[:, 0] = (255 * norm).astype(np.uint8)
+    colors[:, 1] = (120 * (1 - norm) + 60 * norm).astype(np.uint8)
+    colors[:, 2] = (200 * (1 - norm)).astype(np.uint8)
+    colors[:, 3] = 180
+    return colors
 
-    # Calculer un rayon visuel (en mètres) proportionnel à la dose
-    max_dose = map_agg['collective_dose_total'].max()
+
+def _dose_radii(dose):
+    """Map collective doses to circle radii in metres (10k - 120k m)."""
+    max_dose = dose.max()
     if max_dose == 0 or np.isnan(max_dose):
-        map_agg['radius'] = 10000
-    else:
-        # Échelle: 10k - 120k m
-        map_agg['radius'] = map_agg['collective_dose_total'] / max_dose * 110000 + 10000
+        return np.full(len(dose), 10000.0)
+    return dose / max_dose * 110000 + 10000
+
+
+@timed()
+def map_layer_payload(map_agg):
+    """Build the pydeck layer records for the aggregated map data.
+
+    `map_chart` uses a cached version keyed on the content of `map_agg`,
+    so an unchanged map is not re-encoded on every rerun.
+
+    Parameters:
+    -----------
+    map_agg : pd.DataFrame
+        Per-country aggregates with 'latitude' / 'longitude' columns and no
+        missing coordinates
+
+    Returns:
+    --------
+    tuple : (list of point records, centre latitude, centre longitude)
+    """
+    lat = map_agg['latitude'].to_numpy(dtype='float64')
+    lon = map_agg['longitude'].to_numpy(dtype='float64')
+    avg = map_agg['average_dose_monitored'].to_numpy(dtype='float64')
+    dose = map_agg['collective_dose_total'].to_numpy(dtype='float64')
+
+    payload = pd.DataFrame({
+        'country': map_agg['country'].astype(str).to_numpy(),
+        'position': np.column_stack([lon, lat]).tolist(),
+        'radius': _dose_radii(dose),
+        'color': _dose_colors(avg).tolist(),
+        'collective_dose_total': dose,
+        'average_dose_monitored': avg,
+        'total_workers_number': map_agg['total_workers_number'].to_numpy(dtype='float64').round().astype('int64'),
+    })
 
     # Centre initial de la carte (mean of available points)
-    center_lat = map_agg['latitude'].mean()
-    center_lon = map_agg['longitude'].mean()
-    if pd.isna(center_lat) or pd.isna(center_lon):
-        center_lat, center_lon = 50.0, 10.0
+    center_lat = float(lat.mean()) if len(lat) else 50.0
+    center_lon = float(lon.mean()) if len(lon) else 10.0
+    return payload.to_dict('records'), center_lat, center_lon
 
-    # Construire la layer ScatterplotLayer
+
+MAP_TOOLTIP = {
+    "html": "<b>{country}</b><br/>Collective dose: {collective_dose_total} Sv<br/>Average dose: {average_dose_monitored} Sv<br/>Workers: {total_workers_number}",
+    "style": {"backgroundColor": "steelblue", "color": "white"}
+}
+
+
+_cached_map_layer_payload = st.cache_data(show_spinner=False, max_entries=64)(map_layer_payload)
+
+
+def map_deck(records, center_lat, center_lon):
+    """Build the pydeck Deck drawn by `map_chart` from `map_layer_payload`.
+
+    Cheap: the records are only referenced, they are serialised when the
+    Deck is drawn.
+    """
+    import pydeck as pdk
+
+    # Construire la layer ScatterplotLayer (only the columns deck.gl needs)
     layer = pdk.Layer(
         "ScatterplotLayer",
-        data=map_agg,
-        get_position="[longitude, latitude]",
+        id="country-doses",  # fixed id: the same map gives the same JSON
+        data=records,
+        get_position="position",
         get_radius="radius",
         radius_scale=1,
         radius_min_pixels=4,
@@ -165,20 +332,16 @@ def map_chart(data):
         pickable=True,
         auto_highlight=True
     )
-
-    tooltip = {
-        "html": "<b>{country}</b><br/>Collective dose: {collective_dose_total} Sv<br/>Average dose: {average_dose_monitored} Sv<br/>Workers: {total_workers_number}",
-        "style": {"backgroundColor": "steelblue", "color": "white"}
-    }
-
     view_state = pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=4, pitch=0)
+    return pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=MAP_TOOLTIP)
 
-    deck = pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=tooltip)
 
-    st.pydeck_chart(deck)
+def warm_map(data):
+    """Fill the map payload cache for per-country aggregates, without drawing.
 
-    # Display country statistics table
-    st.subheader(":bar_chart: Country statistics")
-    stats = map_agg[['country', 'collective_dose_total', 'average_dose_monitored', 'total_workers_number']].copy()
-    stats.columns = ['Country', 'Collective Dose (Sv)', 'Mean monitored dose (Sv)', 'Workers']
-    st.dataframe(stats.sort_values('Collective Dose (Sv)', ascending=False), use_container_width=True)
\ No newline at end of file
+    Used by the background warm-up (see `utils.warmup`) so the first map of
+    a common selection is served from the cache.
+    """
+    map_agg, _ = prepare_map_data(data)
+    if not map_agg.empty:
+        _cached_map_layer_payload(map_agg)
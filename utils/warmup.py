@@ -0,0 +1,191 @@
+"""Background warm-up of a dashboard process.
+
+The first script run of a process starts a `Warmup` thread (see
+`get_warmup` in app.py; Streamlit has no server-start hook, so the first
+visitor of a process waits for the data like a cold run would) that loads
+the data, builds the engine and the shared rows, and computes the
+rollups of the most common selections:
+the sidebar defaults (every country, full year range, 'All' sectors) and
+each single-sector selection. They land in the process-wide caches
+(`st.cache_resource` and the engine memo), so the first visitors are
+served from them. The thread never holds up a script run: until the data
+is loaded the page only shows the warm-up progress and reloads itself when
+it can be served (see `sections/warmup.py`); the remaining views are then
+computed while the page is used.
+
+`python -m utils.warmup` runs the same steps once, in the foreground, to
+write the on-disk caches (Parquet copy and dose cube) at deploy time,
+before the server starts.
+"""
+
+import importlib
+import threading
+import time
+import traceback
+
+from utils.instrument import stage
+from utils.prep import default_filters, filter_options
+
+
+# Views each section reads for a selection (see sections/)
+WARM_VIEWS = ('year', 'country', ('country', 'year'))
+
+# Imported once the data is ready, so the first chart does not pay for it
+CHART_MODULES = ('altair', 'pydeck')
+
+# Yielded by the steps once the pages can be served (the data is loaded)
+SERVING = object()
+
+
+def _add_script_run_ctx(thread):
+    """Give `thread` the script run context of the calling thread (if any)."""
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    except ImportError:
+        return
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is not None:
+        add_script_run_ctx(thread, ctx)
+
+
+class Warmup:
+    """Run a sequence of warm-up steps in a daemon thread and report progress.
+
+    Parameters:
+    -----------
+    steps : callable
+        Generator function yielding a short description of each step just
+        before running it, and SERVING once the pages can be served
+    """
+
+    def __init__(self, steps):
+        self._steps = steps
+        self._lock = threading.Lock()
+        self._thread = None
+        self.state = 'pending'      # 'pending', 'running', 'serving', 'ready' or 'failed'
+        self.step = None
+        self.done = 0
+        self.error = None
+        self.started_at = None
+        self.seconds = None
+
+    def start(self):
+        """Start the thread (once) and return self.
+
+        Called from a script run, the thread gets its script run context:
+        the `st.cache_*` functions it calls then run as in a script run.
+        """
+        with self._lock:
+            if self._thread is None:
+                self.state = 'running'
+                self.started_at = time.perf_counter()
+                self._thread = threading.Thread(target=self._run, name='dashboard-warmup', daemon=True)
+                _add_script_run_ctx(self._thread)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            with stage('warmup'):
+                for step in self._steps():
+                    with self._lock:
+                        if step is SERVING:
+                            self.state = 'serving'
+                        else:
+                            self.step = step
+                            self.done += 1
+            state, error = 'ready', None
+        except Exception:
+            # The sessions compute what they need themselves
+            state, error = 'failed', traceback.format_exc(limit=3)
+        with self._lock:
+            self.state = state
+            self.error = error
+            self.seconds = time.perf_counter() - self.started_at
+
+    @property
+    def serving(self):
+        """True once the pages can be served (or the warm-up failed: nothing to wait for)."""
+        return self.state in ('serving', 'ready', 'failed')
+
+    @property
+    def ready(self):
+        """True once every step ran (or the warm-up failed)."""
+        return self.state in ('ready', 'failed')
+
+    def status(self):
+        """Return {'state', 'step', 'done', 'seconds', 'error'}; 'seconds' is the
+        elapsed time so far while running."""
+        with self._lock:
+            seconds = self.seconds
+            if seconds is None and self.started_at is not None:
+                seconds = time.perf_counter() - self.started_at
+            return {'state': self.state, 'step': self.step, 'done': self.done,
+                    'seconds': seconds, 'error': self.error}
+
+
+def common_filters(options):
+    """Return the rollup filters of the selections warmed up, most common first.
+
+    The sidebar defaults, then the same with each single sector selected.
+    """
+    choices = filter_options(options)
+    return [default_filters(choices, sector) for sector in choices['sectors']]
+
+
+def warm_views(engine, options):
+    """Compute the rollups of the common selections into the engine memo.
+
+    Generator yielding one description per selection (see `Warmup`).
+    """
+    filters = common_filters(options)
+    if not filters:
+        return
+    yield "Computing the overall figures"
+    engine.totals(labels=filters[0]['labels'])
+    for selection in filters:
+        sector = 'All' if selection['sectors'] is None else selection['sectors'][0]
+        yield f"Computing the views of sector {sector}"
+        engine.totals(**selection)
+        for by in WARM_VIEWS:
+            engine.rollup(by, **selection)
+
+
+def warm_charts(engine, options):
+    """Import the chart libraries and prepare the default map.
+
+    Generator yielding one description per step (see `Warmup`).
+    """
+    from utils.viz import warm_map
+
+    yield "Loading the chart libraries"
+    for name in CHART_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    yield "Preparing the default map"
+    warm_map(engine.rollup('country', **common_filters(options)[0]))
+
+
+def main():
+    from utils import config
+    from utils.cube import CubeEngine, cube_dir
+    from utils.io import load_data
+    from utils.store import DataStore
+
+    start = time.perf_counter()
+    store = DataStore(config.DATA_DIR, streaming=config.STREAMING, parse=config.BACKEND == 'pandas')
+    store.refresh()
+    if config.BACKEND == 'duckdb':
+        # Write the Parquet copies the queries read instead of the CSV
+        for path in sorted(store.files()):
+            load_data(path)
+    else:
+        # Same folder as app.py: the server opens the cube instead of building it
+        CubeEngine(store.partials(), cache_dir=cube_dir(config.DATA_DIR, store.files()))
+    print(f"{len(store.files())} file(s) prepared in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == '__main__':
+    main()